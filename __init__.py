@@ -11,6 +11,7 @@ import fcntl
 import termios
 import signal
 import hashlib
+import heapq
 import resource
 import sys
 from pathlib import Path
@@ -621,8 +622,144 @@ async def mcp_status_handler(request):
         })
 
 
+def _history_timestamp(status):
+    """Timestamp of a history entry's first status message (0 if unknown)."""
+    messages = status.get("messages")
+    if messages and len(messages[0]) >= 2 and isinstance(messages[0][1], dict):
+        return messages[0][1].get("timestamp", 0) or 0
+    return 0
+
+
+async def history_summary_handler(request):
+    """Return a small, most-recent-first page of the prompt history.
+
+    The MCP server only needs status and output node IDs per prompt, so this
+    avoids sending the full /history dump with every output's metadata.
+    """
+    try:
+        offset = max(0, int(request.query.get("offset", 0)))
+        limit = max(1, int(request.query.get("limit", 5)))
+    except ValueError:
+        return web.json_response({"error": "offset and limit must be integers"}, status=400)
+
+    try:
+        from server import PromptServer
+        history = PromptServer.instance.prompt_queue.get_history()
+
+        entries = []
+        for prompt_id, data in history.items():
+            if not isinstance(data, dict):
+                continue
+            status = data.get("status") or {}
+            entries.append((_history_timestamp(status), prompt_id, data, status))
+        # Only the newest offset+limit entries are needed, so skip a full sort
+        newest = heapq.nlargest(offset + limit, entries, key=lambda x: x[0])
+
+        items = []
+        for timestamp, prompt_id, data, status in newest[offset:]:
+            items.append({
+                "id": prompt_id,
+                "timestamp": timestamp,
+                "status": {
+                    "status_str": status.get("status_str"),
+                    "completed": status.get("completed", False),
+                    "messages": status.get("messages", [])
+                },
+                "outputs": list((data.get("outputs") or {}).keys())
+            })
+
+        return web.json_response({"total": len(entries), "items": items})
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+
+
+OBJECT_INFO_PATHS = {"/object_info", "/api/object_info"}
+
+# Projected /object_info bodies: fields param -> (full body ETag, body, ETag)
+object_info_projections = {}
+
+
+def _etag(body):
+    """Weak ETag for a response body.
+
+    Weak because the same ETag is sent for the gzip and identity encodings,
+    which aren't byte-for-byte the same representation.
+    """
+    return f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def _etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _project_object_info(body, fields):
+    """Keep only the given comma-separated fields of every node type."""
+    keep = set(fields.split(","))
+    all_nodes = json.loads(body)
+    projected = {
+        name: {k: v for k, v in info.items() if k in keep}
+        for name, info in all_nodes.items()
+    }
+    return json.dumps(projected, separators=(",", ":")).encode("utf-8")
+
+
+@web.middleware
+async def object_info_etag_middleware(request, handler):
+    """Add an ETag to /object_info responses and answer 304 when it matches.
+
+    The MCP server revalidates its cached node list with If-None-Match, so an
+    unchanged multi-MB payload isn't sent and parsed again. A `fields` query
+    parameter projects each node type to just those keys, and changed
+    payloads are compressed for clients that accept it.
+    """
+    if request.method != "GET" or request.path not in OBJECT_INFO_PATHS:
+        return await handler(request)
+
+    response = await handler(request)
+    body = getattr(response, "body", None)
+    if response.status != 200 or not isinstance(body, (bytes, bytearray)):
+        return response
+
+    etag = _etag(body)
+
+    fields = request.query.get("fields")
+    if fields:
+        # Reuse the projection while the full payload is unchanged
+        cached = object_info_projections.get(fields)
+        if cached is None or cached[0] != etag:
+            try:
+                projected = _project_object_info(body, fields)
+            except (ValueError, AttributeError):
+                return response
+            cached = (etag, projected, _etag(projected))
+            if len(object_info_projections) >= 8:
+                object_info_projections.clear()
+            object_info_projections[fields] = cached
+        _, body, etag = cached
+        response = web.Response(body=body, content_type="application/json")
+
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return web.Response(status=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    # The schema JSON is highly repetitive and compresses well. aiohttp does
+    # the compression and negotiates it with Accept-Encoding; enabling it
+    # again (as ComfyUI's --enable-compress-response-body does) is harmless,
+    # whereas compressing the body here would get it compressed twice
+    response.enable_compression()
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
 def setup_routes(app):
     """Set up the WebSocket and API routes."""
+    app.middlewares.append(object_info_etag_middleware)
     app.router.add_get("/ws/claude-terminal", websocket_handler)
     app.router.add_get("/claude-code/workflow", workflow_handler)
     app.router.add_post("/claude-code/workflow", workflow_handler)
@@ -631,12 +768,14 @@ def setup_routes(app):
     app.router.add_post("/claude-code/graph-command", graph_command_handler)
     app.router.add_get("/claude-code/mcp-status", mcp_status_handler)
     app.router.add_get("/claude-code/memory", memory_stats_handler)
+    app.router.add_get("/claude-code/history-summary", history_summary_handler)
     print("[Claude Code] Terminal WebSocket endpoint registered at /ws/claude-terminal")
     print("[Claude Code] Workflow API endpoint registered at /claude-code/workflow")
     print("[Claude Code] Run node endpoint registered at /claude-code/run-node")
     print("[Claude Code] Graph command endpoint registered at /claude-code/graph-command")
     print("[Claude Code] MCP status endpoint registered at /claude-code/mcp-status")
     print("[Claude Code] Memory stats endpoint registered at /claude-code/memory")
+    print("[Claude Code] History summary endpoint registered at /claude-code/history-summary")
 
 
 def write_comfyui_url():
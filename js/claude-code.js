@@ -1117,6 +1117,50 @@ async function executeGraphCommand(command) {
                 }
             }
 
+            case "batch": {
+                // Run several commands in one round trip. Params may use
+                // {"$ref": name} for a node created earlier in the batch.
+                const refs = {};
+                const results = [];
+                let viewportOffset = 0;
+
+                for (const cmd of params.commands || []) {
+                    const cmdParams = { ...cmd.params };
+                    let missingRef = null;
+                    for (const [key, value] of Object.entries(cmdParams)) {
+                        if (value && typeof value === "object" && "$ref" in value) {
+                            if (!(value.$ref in refs)) {
+                                missingRef = value.$ref;
+                                break;
+                            }
+                            cmdParams[key] = String(refs[value.$ref]);
+                        }
+                    }
+                    if (missingRef !== null) {
+                        results.push({ error: `Unknown ref: ${missingRef}` });
+                        continue;
+                    }
+
+                    const placeInView = cmd.action === "create_node" && cmdParams.place_in_view;
+                    if (placeInView) {
+                        cmdParams.viewport_offset = viewportOffset;
+                    }
+
+                    const result = await executeGraphCommand({ action: cmd.action, params: cmdParams });
+                    if (cmd.action === "create_node" && result.node_id !== undefined) {
+                        if (cmd.ref) {
+                            refs[cmd.ref] = result.node_id;
+                        }
+                        if (placeInView) {
+                            // Node width + gap (default 300 + 30 if size unknown)
+                            viewportOffset += (Array.isArray(result.size) ? result.size[0] : 300) + 30;
+                        }
+                    }
+                    results.push(result);
+                }
+                return { results };
+            }
+
             case "create_node": {
                 const node = LiteGraph.createNode(params.type);
                 if (!node) {
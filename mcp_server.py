@@ -23,62 +23,156 @@ Configure in Claude Code's settings (~/.claude/settings.json):
 }
 """
 
+import atexit
+import binascii
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import gzip
+import hashlib
+import heapq
+import http.client
 import json
+import re
+import select
 import socket
 import sys
+import threading
 import urllib.request
 import urllib.error
 import urllib.parse
-import base64
+import weakref
+import zlib
 from typing import Any
 
+# Compact JSON encoder, built once; json.dumps with non-default arguments
+# constructs a new JSONEncoder on every call
+_json_compact = json.JSONEncoder(separators=(",", ":")).encode
+
 # ComfyUI API endpoint
+def _probe_comfyui(url: str) -> bool:
+    """Check whether a ComfyUI server answers at this URL."""
+    try:
+        req = urllib.request.Request(f"{url}/system_stats", method="GET")
+        with urllib.request.urlopen(req, timeout=2):
+            return True
+    except Exception:
+        return False
+
+
 def get_comfyui_url() -> str:
-    """Get the ComfyUI URL - try common ports."""
+    """Get the ComfyUI URL - try the plugin's URL file, then common ports."""
     import os
 
     # Try to read from the URL file written by the plugin
     script_dir = os.path.dirname(os.path.abspath(__file__))
     url_file = os.path.join(script_dir, ".comfyui_url")
 
+    file_url = None
     if os.path.exists(url_file):
         try:
             with open(url_file, "r") as f:
-                url = f.read().strip()
-                if url:
-                    # Test if this URL works
-                    try:
-                        req = urllib.request.Request(f"{url}/system_stats", method="GET")
-                        with urllib.request.urlopen(req, timeout=2):
-                            return url
-                    except Exception:
-                        pass
+                file_url = f.read().strip() or None
         except Exception:
             pass
 
-    # Try common ports
+    # Candidates in order of preference
+    candidates = [file_url] if file_url else []
     for port in [8000, 8188, 8189]:
         url = f"http://127.0.0.1:{port}"
-        try:
-            req = urllib.request.Request(f"{url}/system_stats", method="GET")
-            with urllib.request.urlopen(req, timeout=2):
-                return url
-        except Exception:
-            continue
+        if url not in candidates:
+            candidates.append(url)
 
-    return "http://127.0.0.1:8000"  # Default for desktop version
+    # Probe all candidates at once, then take the most preferred one that answered
+    chosen = None
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(candidates))
+    try:
+        futures = [executor.submit(_probe_comfyui, url) for url in candidates]
+        for url, future in zip(candidates, futures):
+            if future.result():
+                chosen = url
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if chosen is None:
+        return "http://127.0.0.1:8000"  # Default for desktop version
+
+    # Remember the working URL for the next run
+    if chosen != file_url:
+        try:
+            with open(url_file, "w") as f:
+                f.write(chosen)
+        except OSError:
+            pass
+    return chosen
 
 COMFYUI_URL = None  # Will be set on first request
 
+# Cache for summarize_workflow output, keyed by workflow content hash
+_summary_cache = {}
+SUMMARY_CACHE_SIZE = 16
+
+# Last workflow fetched by the read-only tools, so a burst of get_node_info /
+# view_image calls shares one request; cleared whenever the graph is modified
+_workflow_cache = {"time": 0.0, "workflow": None, "index": None}
+WORKFLOW_CACHE_TTL = 1.5  # seconds; edits made in the browser show up after this
+
+# Prompts fetched before falling back to the full history in view_image
+RECENT_HISTORY_ITEMS = 10
+
+# Graph commands that don't modify the workflow (everything else invalidates caches)
+READ_ONLY_GRAPH_ACTIONS = {"get_workflow_api", "center_on_node"}
+
+# Node types that produce viewable images (Preview Image, Save Image, etc.)
+_IMAGE_TYPE_RE = re.compile(r"preview|saveimage|save image", re.IGNORECASE)
+
 # Cache for object_info (node types) - this rarely changes
 _object_info_cache = None
 _object_info_cache_time = 0
+_object_info_etag = None  # Sent as If-None-Match so unchanged data isn't re-downloaded
+
+# Only these object_info fields are used; the plugin projects the response to them
+OBJECT_INFO_ENDPOINT = "/object_info?fields=display_name,category,description,input,output,output_name"
 CACHE_TTL = 300  # 5 minutes
 
+# Search index over object_info, rebuilt with the cache, sorted by name:
+# (node_name, lowercased "name\0display_name\0description", node_info, TOON header line)
+_object_info_index = []
+
+# Node names grouped by category (categories and names sorted), rebuilt with the cache
+_object_info_categories = {}
+
+# Compact input type list per node type (see _format_input_types), rebuilt with the cache
+_object_info_input_types = {}
+
+# get_node_types category filter results, keyed by lowercased category; cleared on refresh
+_category_match_cache = {}
+CATEGORY_CACHE_SIZE = 64
+
+
+def _workflow_hash(workflow: dict) -> bytes:
+    """Hash the workflow content for use as a cache key.
+
+    BLAKE2b with an 8-byte digest is much cheaper than sha256 on large
+    workflows and collision resistance beyond that isn't needed for caching.
+    """
+    raw = _json_compact(workflow).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=8).digest()
+
+
+def invalidate_workflow_caches():
+    """Drop cached workflow-derived data after the graph is modified."""
+    _summary_cache.clear()
+    _workflow_cache["time"] = 0.0
+    _workflow_cache["workflow"] = None
+    _workflow_cache["index"] = None
+
 
 def get_object_info_cached() -> dict:
     """Get object_info with caching to avoid slow repeated requests."""
-    global _object_info_cache, _object_info_cache_time
+    global _object_info_cache, _object_info_cache_time, _object_info_etag
     import time
 
     current_time = time.time()
@@ -87,53 +181,333 @@ def get_object_info_cached() -> dict:
     if _object_info_cache is not None and (current_time - _object_info_cache_time) < CACHE_TTL:
         return _object_info_cache
 
-    # Fetch fresh data
-    result = make_request("/object_info")
+    # Fetch fresh data, revalidating the expired copy by ETag if we have one
+    extra_headers = None
+    if _object_info_cache is not None and _object_info_etag:
+        extra_headers = {"If-None-Match": _object_info_etag}
+    response_headers = {}
+    result = make_request(OBJECT_INFO_ENDPOINT, extra_headers=extra_headers, response_headers=response_headers)
+
+    if result.get("not_modified"):
+        _object_info_cache_time = current_time
+        return _object_info_cache
 
     if "error" not in result:
         _object_info_cache = result
         _object_info_cache_time = current_time
+        _object_info_etag = response_headers.get("etag")
+        _build_object_info_index(result)
 
     return result
 
 
-def make_request(endpoint: str, method: str = "GET", data: dict = None, timeout: int = None) -> dict:
-    """Make a request to ComfyUI's API."""
+def _build_object_info_index(all_nodes: dict):
+    """Precompute search text, category grouping and input types for every node type."""
+    global _object_info_index, _object_info_categories, _object_info_input_types
+    _category_match_cache.clear()
+    _object_info_input_types = {
+        node_name: _format_input_types(node_info)
+        for node_name, node_info in all_nodes.items()
+    }
+
+    categories = collections.defaultdict(list)
+    for node_name, node_info in all_nodes.items():
+        categories[node_info.get("category", "uncategorized")].append(node_name)
+    for node_names in categories.values():
+        node_names.sort()
+    _object_info_categories = {cat: categories[cat] for cat in sorted(categories)}
+
+    _object_info_index = [
+        (
+            node_name,
+            "\0".join((
+                node_name,
+                node_info.get("display_name") or "",
+                node_info.get("description") or ""
+            )).lower(),
+            node_info,
+            _node_header(node_name, node_info)
+        )
+        for node_name, node_info in sorted(all_nodes.items())
+    ]
+
+
+def _format_input_types(node_info: dict) -> str:
+    """Compact input list for a node type: name:TYPE,... with * marking required."""
+    input_info = node_info.get("input", {})
+    inputs = []
+    for group in ["required", "optional"]:
+        if group in input_info:
+            req_marker = "*" if group == "required" else ""
+            for inp_name, inp_def in input_info[group].items():
+                if isinstance(inp_def, list) and len(inp_def) > 0:
+                    inp_type = inp_def[0] if isinstance(inp_def[0], str) else type(inp_def[0]).__name__
+                    inputs.append(f"{inp_name}{req_marker}:{inp_type}")
+    return ",".join(inputs)
+
+
+def _node_header(node_name: str, node_info: dict) -> str:
+    """TOON line for a node type: name,display,category (commas escaped)."""
+    display_name = (node_info.get("display_name") or node_name).replace(",", ";")
+    cat = node_info.get("category", "uncategorized").replace(",", ";")
+    return f"  {node_name},{display_name},{cat}"
+
+
+def get_base_url() -> str:
+    """Get the ComfyUI base URL, probing for it on first use."""
     global COMFYUI_URL
     if COMFYUI_URL is None:
         COMFYUI_URL = get_comfyui_url()
+    return COMFYUI_URL
+
+
+# ============== HTTP CONNECTION POOL ==============
+
+# Keep-alive connections, one per (scheme, host, port) per thread
+_http_local = threading.local()
+
+# Every live pooled connection across threads, so they can be closed on exit.
+# Weak, so connections dropped with their thread don't pile up here.
+_http_all_connections = weakref.WeakSet()
+_http_all_connections_lock = threading.Lock()
+
+
+def close_http_connections():
+    """Close all pooled connections (registered with atexit)."""
+    with _http_all_connections_lock:
+        for conn in list(_http_all_connections):
+            conn.close()
+        _http_all_connections.clear()
+
+
+atexit.register(close_http_connections)
+
+
+def close_thread_http_connections():
+    """Close this thread's pooled connections, for worker threads about to exit."""
+    connections = getattr(_http_local, "connections", None)
+    if not connections:
+        return
+    with _http_all_connections_lock:
+        for conn in connections.values():
+            conn.close()
+            _http_all_connections.discard(conn)
+    connections.clear()
+
+
+def _http_connection(scheme: str, host: str, port: int, timeout: float) -> http.client.HTTPConnection:
+    """Get this thread's persistent connection to a host, creating it if needed."""
+    connections = getattr(_http_local, "connections", None)
+    if connections is None:
+        connections = _http_local.connections = {}
+
+    key = (scheme, host, port)
+    conn = connections.get(key)
+    if conn is None:
+        conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conn_class(host, port, timeout=timeout)
+        connections[key] = conn
+        with _http_all_connections_lock:
+            _http_all_connections.add(conn)
+    elif conn.sock is not None:
+        # An idle keep-alive socket that is readable has been closed by the server
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            readable = True
+        if readable:
+            conn.close()
+
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn
+
+
+def _http_send(method: str, url: str, body: bytes, headers: dict, timeout: float) -> tuple:
+    """Send one request over this thread's pooled connection.
+
+    Returns:
+        Tuple of (connection, response)
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    for attempt in range(2):
+        conn = _http_connection(parts.scheme, parts.hostname, parts.port, timeout)
+        reused = conn.sock is not None
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            return conn, conn.getresponse()
+        except Exception as e:
+            # Reset the connection; left half-used it would refuse every later request
+            conn.close()
+            stale = isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError))
+            # Retry idempotent requests once if a reused connection went stale
+            if not stale or attempt or not reused or method not in ("GET", "HEAD"):
+                raise
+
+
+HTTP_REDIRECT_CODES = (301, 302, 303, 307, 308)
+HTTP_MAX_REDIRECTS = 10
+
+
+@contextlib.contextmanager
+def http_open(method: str, url: str, body: bytes = None, headers: dict = None, timeout: float = 10,
+              follow_redirects: bool = False):
+    """Send a request over a pooled keep-alive connection and yield the response.
+
+    The connection stays open for reuse once the response body has been fully
+    read. If the caller stops early or an error occurs it is closed instead.
+
+    Args:
+        follow_redirects: Follow Location redirects (up to HTTP_MAX_REDIRECTS).
+                          The final URL is available as response.url.
+    """
+    # HTTP/1.1 keeps connections open by default; say so for servers that don't assume it
+    headers = dict(headers) if headers else {}
+    headers.setdefault("Connection", "keep-alive")
+
+    conn, response = _http_send(method, url, body, headers, timeout)
+    redirects = 0
+    while follow_redirects and response.status in HTTP_REDIRECT_CODES:
+        location = response.getheader("Location")
+        if not location or redirects == HTTP_MAX_REDIRECTS:
+            break
+        redirects += 1
+        response.read()  # Drain so the connection can be reused
+        next_url = urllib.parse.urljoin(url, location)
+        # Don't hand credentials to another host (e.g. a CDN holding the file)
+        if urllib.parse.urlsplit(next_url).netloc != urllib.parse.urlsplit(url).netloc:
+            headers.pop("Authorization", None)
+        if response.status == 303 or (response.status in (301, 302) and method == "POST"):
+            method, body = "GET", None
+        url = next_url
+        conn, response = _http_send(method, url, body, headers, timeout)
+    response.url = url
+
+    try:
+        yield response
+    finally:
+        if not response.isclosed():
+            conn.close()
+
+
+# Parsed GET response bodies keyed by body hash; repeated polls of /queue,
+# /system_stats etc. often return identical bytes. Results are shared, so
+# callers must treat them as read-only.
+_decode_cache = collections.OrderedDict()
+_decode_cache_lock = threading.Lock()
+DECODE_CACHE_SIZE = 16
+DECODE_CACHE_MAX_BODY = 1 << 20  # Larger bodies are parsed without caching
+
+
+def _decode_cached(raw: bytes):
+    """json.loads with a small LRU keyed by the body's BLAKE2b hash."""
+    if len(raw) > DECODE_CACHE_MAX_BODY:
+        return json.loads(raw)
+
+    key = hashlib.blake2b(raw, digest_size=8).digest()
+    with _decode_cache_lock:
+        parsed = _decode_cache.get(key)
+        if parsed is not None:
+            _decode_cache.move_to_end(key)
+            return parsed
+
+    parsed = json.loads(raw)
+    with _decode_cache_lock:
+        _decode_cache[key] = parsed
+        if len(_decode_cache) > DECODE_CACHE_SIZE:
+            _decode_cache.popitem(last=False)
+    return parsed
+
+
+# Shared worker pool for concurrent requests, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Get the shared thread pool for fanning out independent requests."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix="comfy-pilot"
+                )
+    return _executor
+
+
+def make_request(endpoint: str, method: str = "GET", data: dict = None, timeout: int = None,
+                 extra_headers: dict = None, response_headers: dict = None) -> dict:
+    """Make a request to ComfyUI's API.
+
+    Args:
+        extra_headers: Additional request headers (e.g. If-None-Match)
+        response_headers: Optional dict filled with the response headers, lowercased
 
-    url = f"{COMFYUI_URL}{endpoint}"
+    Returns {"not_modified": True} when the server answers 304.
+    """
+    url = f"{get_base_url()}{endpoint}"
 
     # Use longer timeout for /object_info since it can be large
     if timeout is None:
-        timeout = 30 if endpoint == "/object_info" else 10
+        timeout = 30 if endpoint.startswith("/object_info") else 10
 
-    try:
-        if data:
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(data).encode("utf-8"),
-                headers={"Content-Type": "application/json"},
-                method=method
-            )
-        else:
-            req = urllib.request.Request(url, method=method)
+    body = None
+    headers = {"Accept-Encoding": "gzip, deflate"}
+    if extra_headers:
+        headers.update(extra_headers)
+    if data:
+        body = _json_compact(data).encode("utf-8")
+        headers["Content-Type"] = "application/json"
 
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            return json.loads(response.read().decode("utf-8"))
-    except urllib.error.URLError as e:
-        return {"error": f"Failed to connect to ComfyUI: {e}"}
-    except urllib.error.HTTPError as e:
-        return {"error": f"HTTP error from ComfyUI: {e.code} {e.reason}"}
+    try:
+        with http_open(method, url, body=body, headers=headers, timeout=timeout) as response:
+            raw = response.read()
+            encoding = response.getheader("Content-Encoding", "").lower()
+            if encoding == "gzip":
+                raw = gzip.decompress(raw)
+            elif encoding == "deflate":
+                raw = zlib.decompress(raw)
+            if response_headers is not None:
+                response_headers.update((k.lower(), v) for k, v in response.getheaders())
+            if response.status == 304:
+                return {"not_modified": True}
+            if response.status >= 400:
+                return {"error": f"HTTP error from ComfyUI: {response.status} {response.reason}"}
+            # json.loads decodes UTF-8 bytes itself, no intermediate str needed
+            if method == "GET":
+                return _decode_cached(raw)
+            return json.loads(raw)
     except socket.timeout:
         return {"error": f"Request to ComfyUI timed out after {timeout}s"}
+    except (gzip.BadGzipFile, zlib.error, EOFError):
+        return {"error": "Invalid compressed response from ComfyUI"}
+    except (OSError, http.client.HTTPException) as e:
+        return {"error": f"Failed to connect to ComfyUI: {e}"}
     except json.JSONDecodeError:
         return {"error": "Invalid JSON response from ComfyUI"}
     except Exception as e:
         return {"error": f"Unexpected error: {type(e).__name__}: {e}"}
 
 
+def parse_node_id(value) -> int:
+    """Normalize a node ID from tool arguments to the int form used by the graph.
+
+    Raises ValueError for IDs that are not integers.
+    """
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"invalid node_id '{value}'") from None
+
+
 def get_workflow() -> dict:
     """Get the current workflow from ComfyUI."""
     # First try to get the live workflow from our plugin endpoint
@@ -169,6 +543,47 @@ def get_workflow() -> dict:
     return {"message": "No workflow found"}
 
 
+def _load_workflow() -> tuple:
+    """Fetch the current workflow graph for the read-only tools.
+
+    A fetch is reused for WORKFLOW_CACHE_TTL seconds; callers must treat the
+    workflow as read-only.
+
+    Returns:
+        Tuple of (workflow dict, None) on success, or (None, error message)
+    """
+    import time
+
+    now = time.monotonic()
+    if _workflow_cache["workflow"] is not None and now - _workflow_cache["time"] < WORKFLOW_CACHE_TTL:
+        return _workflow_cache["workflow"], None
+
+    workflow_data = get_workflow()
+    error = workflow_data.get("error") or workflow_data.get("message")
+    if error:
+        return None, error
+    workflow = workflow_data.get("workflow", {})
+    _workflow_cache["time"] = now
+    _workflow_cache["workflow"] = workflow
+    _workflow_cache["index"] = None  # Built on first lookup by _workflow_node
+    return workflow, None
+
+
+def _workflow_node(workflow: dict, node_id: int) -> dict:
+    """Find a node in a graph-format workflow by ID.
+
+    For the cached workflow an ID index is built once and reused by later
+    lookups; other workflows are scanned.
+    """
+    nodes = workflow.get("nodes", [])
+    if workflow is _workflow_cache["workflow"]:
+        index = _workflow_cache["index"]
+        if index is None:
+            index = _workflow_cache["index"] = {n.get("id"): n for n in reversed(nodes)}
+        return index.get(node_id)
+    return next((n for n in nodes if n.get("id") == node_id), None)
+
+
 def get_node_types(search = None, category: str = None, fields: list = None) -> str:
     """Get available node types in ComfyUI, optionally filtered.
 
@@ -188,37 +603,25 @@ def get_node_types(search = None, category: str = None, fields: list = None) ->
     fields = fields or []
 
     # Helper to format a single node in TOON
-    def format_node(node_name: str, node_info: dict) -> list:
-        """Return lines for a single node."""
-        lines = []
-        display_name = node_info.get("display_name") or node_name
-        cat = node_info.get("category", "uncategorized")
-
-        # Escape commas
-        display_name = display_name.replace(",", ";")
-        cat = cat.replace(",", ";")
-
-        header = f"  {node_name},{display_name},{cat}"
+    def format_node(node_name: str, node_info: dict, header: str) -> list:
+        """Return lines for a single node, starting from its precomputed header."""
+        if not fields:
+            return [header]
 
+        lines = []
         if "description" in fields:
             desc = (node_info.get("description") or "").replace("\n", " ").replace(",", ";")[:100]
             header += f",{desc}"
 
         lines.append(header)
 
-        # Input types (compact)
+        # Input types (compact, precomputed with the cache)
         if "input_types" in fields or "inputs" in fields:
-            input_info = node_info.get("input", {})
-            inputs = []
-            for group in ["required", "optional"]:
-                if group in input_info:
-                    req_marker = "*" if group == "required" else ""
-                    for inp_name, inp_def in input_info[group].items():
-                        if isinstance(inp_def, list) and len(inp_def) > 0:
-                            inp_type = inp_def[0] if isinstance(inp_def[0], str) else type(inp_def[0]).__name__
-                            inputs.append(f"{inp_name}{req_marker}:{inp_type}")
+            inputs = _object_info_input_types.get(node_name)
+            if inputs is None:
+                inputs = _format_input_types(node_info)
             if inputs:
-                lines.append(f"    in: {','.join(inputs)}")
+                lines.append(f"    in: {inputs}")
 
         # Output types (compact)
         if "output_types" in fields or "outputs" in fields:
@@ -235,62 +638,56 @@ def get_node_types(search = None, category: str = None, fields: list = None) ->
 
     # If no filters, return category summary
     if not search and not category:
-        categories = {}
-        for node_name, node_info in all_nodes.items():
-            cat = node_info.get("category", "uncategorized")
-            if cat not in categories:
-                categories[cat] = []
-            categories[cat].append(node_name)
-
+        categories = _object_info_categories
         lines = [f"total: {len(all_nodes)} nodes"]
         lines.append(f"categories[{len(categories)}]{{name,count}}:")
-        for cat in sorted(categories.keys()):
-            lines.append(f"  {cat},{len(categories[cat])}")
+        for cat, node_names in categories.items():
+            lines.append(f"  {cat},{len(node_names)}")
         lines.append("hint: use 'search' or 'category' parameter to filter")
         return "\n".join(lines)
 
-    # Helper function to search for a single term
-    def search_nodes(term: str) -> list:
-        term_lower = term.lower()
-        matches = []
-        for node_name, node_info in all_nodes.items():
-            display_name = node_info.get("display_name") or ""
-            description = node_info.get("description") or ""
-            if (term_lower in node_name.lower() or
-                term_lower in display_name.lower() or
-                term_lower in description.lower()):
-                matches.append((node_name, node_info))
-        return matches
-
-    # Filter by search term(s)
+    # Filter by search term(s) - one pass over the prebuilt index for all terms
     if search:
         search_terms = search if isinstance(search, list) else [search]
-        lines = []
+        terms_lower = [term.lower() for term in search_terms]
+        term_matches = [[] for _ in search_terms]
+        for node_name, haystack, node_info, header in _object_info_index:
+            for term_lower, matches in zip(terms_lower, term_matches):
+                if term_lower in haystack:
+                    matches.append((node_name, node_info, header))
 
-        for term in search_terms:
-            matches = search_nodes(term)
+        lines = []
+        for term, matches in zip(search_terms, term_matches):
             lines.append(f"search \"{term}\": {len(matches)} matches")
             if matches:
                 lines.append(f"nodes[{len(matches)}]{{name,display,category}}:")
-                for node_name, node_info in sorted(matches, key=lambda x: x[0]):
-                    lines.extend(format_node(node_name, node_info))
+                # The index is sorted by name, so matches already are too
+                for node_name, node_info, header in matches:
+                    lines.extend(format_node(node_name, node_info, header))
 
         return "\n".join(lines)
 
     # Filter by category
     if category:
         category_lower = category.lower()
-        matches = []
-        for node_name, node_info in all_nodes.items():
-            cat = node_info.get("category", "")
-            if category_lower in cat.lower():
-                matches.append((node_name, node_info))
+        matches = _category_match_cache.get(category_lower)
+        if matches is None:
+            # Filter the name-sorted index so matches come out sorted
+            matching = {cat for cat in _object_info_categories if category_lower in cat.lower()}
+            matches = [
+                (node_name, node_info, header)
+                for node_name, _, node_info, header in _object_info_index
+                if node_info.get("category", "uncategorized") in matching
+            ]
+            if len(_category_match_cache) >= CATEGORY_CACHE_SIZE:
+                _category_match_cache.clear()
+            _category_match_cache[category_lower] = matches
 
         lines = [f"category \"{category}\": {len(matches)} matches"]
         if matches:
             lines.append(f"nodes[{len(matches)}]{{name,display,category}}:")
-            for node_name, node_info in sorted(matches, key=lambda x: x[0]):
-                lines.extend(format_node(node_name, node_info))
+            for node_name, node_info, header in matches:
+                lines.extend(format_node(node_name, node_info, header))
 
         return "\n".join(lines)
 
@@ -310,10 +707,17 @@ def interrupt_generation() -> dict:
     return make_request("/interrupt", method="POST")
 
 
-def get_history(prompt_id: str = None) -> dict:
-    """Get prompt history, optionally for a specific prompt ID."""
+def get_history(prompt_id: str = None, max_items: int = None) -> dict:
+    """Get prompt history, optionally for a specific prompt ID.
+
+    Args:
+        prompt_id: Only return the entry for this prompt
+        max_items: Only return the most recent N prompts
+    """
     if prompt_id:
         return make_request(f"/history/{prompt_id}")
+    if max_items:
+        return make_request(f"/history?max_items={int(max_items)}")
     return make_request("/history")
 
 
@@ -343,8 +747,17 @@ def get_status(include: list = None, detail: str = "summary", history_limit: int
 
     lines = []
 
-    if "queue" in include:
-        raw_queue = make_request("/queue")
+    # Fetch the requested sections concurrently; each worker keeps its own connection
+    executor = _get_executor()
+    queue_future = executor.submit(make_request, "/queue") if "queue" in include else None
+    system_future = executor.submit(make_request, "/system_stats") if "system" in include else None
+    history_future = (
+        executor.submit(_get_history_page, history_offset, history_limit)
+        if "history" in include else None
+    )
+
+    if queue_future:
+        raw_queue = queue_future.result()
         if "error" in raw_queue:
             lines.append(f"queue: error - {raw_queue.get('error')}")
         else:
@@ -358,8 +771,8 @@ def get_status(include: list = None, detail: str = "summary", history_limit: int
                 prompt_ids = [item[1][:8] if len(item) > 1 and item[1] else "?" for item in pending]
                 lines.append(f"  pending: {','.join(prompt_ids)}")
 
-    if "system" in include:
-        sys_stats = make_request("/system_stats")
+    if system_future:
+        sys_stats = system_future.result()
         if "error" in sys_stats:
             lines.append(f"system: error - {sys_stats.get('error')}")
         else:
@@ -383,46 +796,80 @@ def get_status(include: list = None, detail: str = "summary", history_limit: int
                     pct = (vram_used / vram_total) * 100
                     lines.append(f"  gpu{i}: {name[:30]}, {vram_used_gb:.1f}/{vram_total_gb:.1f}GB ({pct:.0f}% used)")
 
-    if "history" in include:
-        raw_history = make_request("/history")
-        if "error" in raw_history:
-            lines.append(f"history: error - {raw_history.get('error')}")
+    if history_future:
+        page = history_future.result()
+        if "error" in page:
+            lines.append(f"history: error - {page.get('error')}")
         else:
-            # Sort by timestamp (most recent first)
-            history_items = []
-            for prompt_id, data in raw_history.items():
-                if not isinstance(data, dict):
-                    continue
-                status = data.get("status", {})
-                timestamp = status.get("messages", [[0, {}]])[0][0] if status.get("messages") else 0
-                history_items.append((prompt_id, data, timestamp))
-
-            history_items.sort(key=lambda x: x[2], reverse=True)
-            total_count = len(history_items)
-            history_items = history_items[history_offset:history_offset + history_limit]
+            total_count = page["total"]
+            history_items = page["items"]
 
             lines.append(f"history: {total_count} total (showing {history_offset+1}-{history_offset+len(history_items)})")
 
             if detail == "full":
                 lines.append("entries{id,status,time,outputs}:")
-                for prompt_id, data, _ in history_items:
-                    outputs = data.get("outputs", {})
-                    status = data.get("status", {})
-                    status_str = status.get("status_str", "?")
+                for item in history_items:
+                    status = item.get("status") or {}
+                    status_str = status.get("status_str") or "?"
                     exec_time = _get_execution_time(status)
-                    output_nodes = ",".join(outputs.keys()) if outputs else "none"
-                    lines.append(f"  {prompt_id[:8]},{status_str},{exec_time},{output_nodes}")
+                    output_nodes = ",".join(item.get("outputs") or []) or "none"
+                    lines.append(f"  {item['id'][:8]},{status_str},{exec_time},{output_nodes}")
             else:
                 lines.append("entries{id,status,completed}:")
-                for prompt_id, data, _ in history_items:
-                    status = data.get("status", {})
-                    status_str = status.get("status_str", "?")
+                for item in history_items:
+                    status = item.get("status") or {}
+                    status_str = status.get("status_str") or "?"
                     completed = "yes" if status.get("completed", False) else "no"
-                    lines.append(f"  {prompt_id[:8]},{status_str},{completed}")
+                    lines.append(f"  {item['id'][:8]},{status_str},{completed}")
 
     return "\n".join(lines)
 
 
+def _history_timestamp(status: dict):
+    """Timestamp of a history entry's first status message (0 if unknown)."""
+    messages = status.get("messages")
+    if messages and len(messages[0]) >= 2 and isinstance(messages[0][1], dict):
+        return messages[0][1].get("timestamp", 0) or 0
+    return 0
+
+
+def _get_history_page(offset: int, limit: int) -> dict:
+    """Get a most-recent-first page of prompt history.
+
+    Uses the plugin's /claude-code/history-summary projection, falling back to
+    the full /history dump when the plugin endpoint isn't available.
+
+    Returns:
+        {"total": N, "items": [{id, timestamp, status, outputs}, ...]} or {"error": ...}
+    """
+    page = make_request(f"/claude-code/history-summary?offset={int(offset)}&limit={int(limit)}")
+    if "error" not in page:
+        return page
+
+    raw_history = make_request("/history")
+    if "error" in raw_history:
+        return raw_history
+
+    history_items = []
+    for prompt_id, data in raw_history.items():
+        if not isinstance(data, dict):
+            continue
+        status = data.get("status", {})
+        history_items.append((prompt_id, data, _history_timestamp(status)))
+
+    # Only the newest offset+limit entries are needed, so skip a full sort
+    newest = heapq.nlargest(offset + limit, history_items, key=lambda x: x[2])
+    items = []
+    for prompt_id, data, timestamp in newest[offset:]:
+        items.append({
+            "id": prompt_id,
+            "timestamp": timestamp,
+            "status": data.get("status", {}),
+            "outputs": list((data.get("outputs") or {}).keys())
+        })
+    return {"total": len(history_items), "items": items}
+
+
 def _get_execution_time(status: dict) -> str:
     """Extract execution time from status messages."""
     messages = status.get("messages", [])
@@ -448,6 +895,28 @@ def _get_execution_time(status: dict) -> str:
     return "unknown"
 
 
+def _run_single(node_id: str) -> dict:
+    """Validate one node ID against the workflow and queue the workflow."""
+    # Fetch workflow API on demand via graph command (avoids constant polling flicker)
+    workflow_api_result = send_graph_command("get_workflow_api", {})
+    if "error" in workflow_api_result:
+        return workflow_api_result
+
+    workflow_api = workflow_api_result.get("workflow_api")
+    if not workflow_api:
+        return {"error": "No workflow available. Make sure ComfyUI is open in browser."}
+
+    prompt = workflow_api.get("output", workflow_api)
+    if node_id not in prompt:
+        return {"error": f"Node(s) not found in workflow: {[node_id]}"}
+
+    # Queue via frontend so preview images show in the UI (uses browser's client_id)
+    result = send_graph_command("queue_prompt", {})
+    if "error" in result:
+        return {"error": result["error"], "node_id": node_id}
+    return {"status": "queued", "prompt_id": result.get("prompt_id"), "node_id": node_id}
+
+
 def run(action: str = "queue", node_ids = None) -> dict:
     """Run or control workflow execution.
 
@@ -459,6 +928,10 @@ def run(action: str = "queue", node_ids = None) -> dict:
         return make_request("/interrupt", method="POST")
 
     if action == "queue":
+        # Common case: a single node ID
+        if isinstance(node_ids, str) and node_ids:
+            return _run_single(node_ids)
+
         # Fetch workflow API on demand
         workflow_api_result = send_graph_command("get_workflow_api", {})
 
@@ -493,6 +966,19 @@ def run(action: str = "queue", node_ids = None) -> dict:
     return {"error": f"Unknown action: {action}. Use 'queue' or 'interrupt'."}
 
 
+class _OpResult:
+    """Outcome of one edit_graph operation."""
+
+    __slots__ = ("action", "index", "node_id", "error", "unknown")
+
+    def __init__(self, action: str, index: int):
+        self.action = action
+        self.index = index
+        self.node_id = None
+        self.error = None
+        self.unknown = None  # Why the outcome is unknown, if it is
+
+
 def edit_graph(operations) -> str:
     """Edit the workflow graph with one or more operations.
 
@@ -519,158 +1005,120 @@ def edit_graph(operations) -> str:
     if "error" in all_nodes:
         return f"error: {all_nodes.get('error', 'Failed to get node types')}"
 
+    # Validate and translate operations into frontend commands up front, so
+    # invalid ones fail without a round trip. Nodes created earlier in this
+    # call are referenced with {"$ref": name} tokens.
     results = []
-    created_nodes = {}  # Map temp refs to real node IDs
-    viewport_offset = 0  # Horizontal offset for place_in_view nodes
+    commands = []
+    command_spans = []  # (first command index, command count) per operation
+    created_types = {}  # ref -> node type for creates in this call
 
     for i, op in enumerate(operations):
         action = op.get("action", "")
-        result = {"action": action, "index": i}
+        result = _OpResult(action, i)
+        op_commands = []
 
         try:
-            if action == "create":
-                node_type = op.get("node_type", "")
-                if not node_type:
-                    result["error"] = "node_type is required"
-                elif node_type not in all_nodes:
-                    result["error"] = f"Unknown node type: {node_type}"
-                else:
-                    place_in_view = op.get("place_in_view", False)
-                    r = send_graph_command("create_node", {
-                        "type": node_type,
-                        "pos_x": op.get("pos_x", 100),
-                        "pos_y": op.get("pos_y", 100),
-                        "title": op.get("title"),
-                        "place_in_view": place_in_view,
-                        "viewport_offset": viewport_offset if place_in_view else 0
-                    })
-                    result.update(r)
-                    # Store created node ID for reference
-                    if "node_id" in r:
-                        ref = op.get("ref")
-                        if ref:
-                            created_nodes[ref] = r["node_id"]
-                        # Increment viewport offset for next place_in_view node
-                        if place_in_view:
-                            # Use node size + gap for offset (default 300 + 30 if size unknown)
-                            node_width = r.get("size", [300, 100])[0] if isinstance(r.get("size"), list) else 300
-                            viewport_offset += node_width + 30
+            error = _validate_op(op, all_nodes, created_types)
+            if error:
+                result.error = error
+
+            elif action == "create":
+                node_type = op["node_type"]
+                command = {"action": "create_node", "params": {
+                    "type": node_type,
+                    "pos_x": op.get("pos_x", 100),
+                    "pos_y": op.get("pos_y", 100),
+                    "title": op.get("title"),
+                    "place_in_view": op.get("place_in_view", False)
+                }}
+                ref = op.get("ref")
+                if ref:
+                    command["ref"] = ref
+                    created_types[ref] = node_type
+                op_commands.append(command)
 
             elif action == "delete":
                 node_ids = op.get("node_ids") or [op.get("node_id")]
                 for node_id in node_ids:
                     if node_id:
-                        r = send_graph_command("delete_node", {"node_id": str(node_id)})
-                        result.update(r)
+                        op_commands.append({"action": "delete_node", "params": {
+                            "node_id": _node_ref_param(node_id, created_types)
+                        }})
 
             elif action == "move":
-                node_id = op.get("node_id", "")
-                if not node_id:
-                    result["error"] = "node_id is required"
-                else:
-                    # Resolve reference if needed
-                    if node_id in created_nodes:
-                        node_id = created_nodes[node_id]
-                    relative_to = op.get("relative_to")
-                    if relative_to and relative_to in created_nodes:
-                        relative_to = created_nodes[relative_to]
-
-                    r = send_graph_command("move_node", {
-                        "node_id": str(node_id),
-                        "x": op.get("x"),
-                        "y": op.get("y"),
-                        "relative_to": str(relative_to) if relative_to else None,
-                        "direction": op.get("direction"),
-                        "gap": op.get("gap", 30),
-                        "width": op.get("width"),
-                        "height": op.get("height")
-                    })
-                    result.update(r)
+                relative_to = op.get("relative_to")
+                op_commands.append({"action": "move_node", "params": {
+                    "node_id": _node_ref_param(op["node_id"], created_types),
+                    "x": op.get("x"),
+                    "y": op.get("y"),
+                    "relative_to": _node_ref_param(relative_to, created_types) if relative_to else None,
+                    "direction": op.get("direction"),
+                    "gap": op.get("gap", 30),
+                    "width": op.get("width"),
+                    "height": op.get("height")
+                }})
 
             elif action == "resize":
-                node_id = op.get("node_id", "")
-                if not node_id:
-                    result["error"] = "node_id is required"
-                else:
-                    if node_id in created_nodes:
-                        node_id = created_nodes[node_id]
-                    r = send_graph_command("move_node", {
-                        "node_id": str(node_id),
-                        "width": op.get("width"),
-                        "height": op.get("height")
-                    })
-                    result.update(r)
+                op_commands.append({"action": "move_node", "params": {
+                    "node_id": _node_ref_param(op["node_id"], created_types),
+                    "width": op.get("width"),
+                    "height": op.get("height")
+                }})
 
             elif action == "set":
-                node_id = op.get("node_id", "")
-                if not node_id:
-                    result["error"] = "node_id is required"
-                else:
-                    if node_id in created_nodes:
-                        node_id = created_nodes[node_id]
-
-                    # Support both single property and multiple properties
-                    properties = op.get("properties", {})
-                    if "property" in op:
-                        properties[op["property"]] = op.get("value")
-
-                    for prop_name, value in properties.items():
-                        r = send_graph_command("set_node_property", {
-                            "node_id": str(node_id),
-                            "property_name": prop_name,
-                            "value": value
-                        })
-                        result.update(r)
-
-            elif action == "connect":
-                from_node = op.get("from_node", "")
-                to_node = op.get("to_node", "")
-                if not from_node or not to_node:
-                    result["error"] = "from_node and to_node are required"
-                else:
-                    if from_node in created_nodes:
-                        from_node = created_nodes[from_node]
-                    if to_node in created_nodes:
-                        to_node = created_nodes[to_node]
-
-                    r = send_graph_command("connect_nodes", {
-                        "from_node_id": str(from_node),
-                        "from_slot": op.get("from_slot", 0),
-                        "to_node_id": str(to_node),
-                        "to_slot": op.get("to_slot", 0)
-                    })
-                    result.update(r)
-
-            elif action == "disconnect":
-                from_node = op.get("from_node", "")
-                to_node = op.get("to_node", "")
-                if not from_node or not to_node:
-                    result["error"] = "from_node and to_node are required"
-                else:
-                    if from_node in created_nodes:
-                        from_node = created_nodes[from_node]
-                    if to_node in created_nodes:
-                        to_node = created_nodes[to_node]
-
-                    r = send_graph_command("disconnect_nodes", {
-                        "from_node_id": str(from_node),
-                        "from_slot": op.get("from_slot", 0),
-                        "to_node_id": str(to_node),
-                        "to_slot": op.get("to_slot", 0)
-                    })
-                    result.update(r)
-
-            else:
-                result["error"] = f"Unknown action: {action}"
+                # Support both single property and multiple properties
+                properties = op.get("properties", {})
+                if "property" in op:
+                    properties[op["property"]] = op.get("value")
+
+                for prop_name, value in properties.items():
+                    op_commands.append({"action": "set_node_property", "params": {
+                        "node_id": _node_ref_param(op["node_id"], created_types),
+                        "property_name": prop_name,
+                        "value": value
+                    }})
+
+            elif action in ("connect", "disconnect"):
+                op_commands.append({"action": f"{action}_nodes", "params": {
+                    "from_node_id": _node_ref_param(op["from_node"], created_types),
+                    "from_slot": op.get("from_slot", 0),
+                    "to_node_id": _node_ref_param(op["to_node"], created_types),
+                    "to_slot": op.get("to_slot", 0)
+                }})
 
         except Exception as e:
-            result["error"] = str(e)
+            result.error = str(e)
+            op_commands = []
 
+        command_spans.append((len(commands), len(op_commands)))
+        commands.extend(op_commands)
         results.append(result)
 
-    # Build TOON response
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
+    # Run every command in a single round trip to the frontend
+    command_results = run_graph_commands(commands) if commands else []
+
+    created_nodes = {}  # Map temp refs to real node IDs
+    for op, result, (start, count) in zip(operations, results, command_spans):
+        for r in command_results[start:start + count]:
+            if "error" in r:
+                result.error = r["error"]
+            elif r.get("status") == "unknown":
+                result.unknown = r["message"]
+            if "node_id" in r:
+                result.node_id = r["node_id"]
+        ref = op.get("ref")
+        if ref and result.action == "create" and result.node_id is not None:
+            created_nodes[ref] = result.node_id
+
+    # Build TOON response - collect failures in a single pass
+    failed = []
+    unknown = []
+    for r in results:
+        if r.error is not None:
+            failed.append(r)
+        elif r.unknown is not None:
+            unknown.append(r)
 
     lines = []
 
@@ -678,10 +1126,12 @@ def edit_graph(operations) -> str:
     if failed:
         lines.append(f"failed: {len(failed)}/{len(results)}")
     else:
-        lines.append(f"ok: {len(results)}/{len(results)}")
+        lines.append(f"ok: {len(results) - len(unknown)}/{len(results)}")
+    if unknown:
+        lines.append(f"unknown: {len(unknown)}/{len(results)} ({unknown[0].unknown})")
 
     # Show created node IDs
-    created_ids = [str(r.get("node_id")) for r in results if r.get("action") == "create" and "node_id" in r]
+    created_ids = [str(r.node_id) for r in results if r.action == "create" and r.node_id is not None]
     if created_ids:
         lines.append(f"created: {','.join(created_ids)}")
 
@@ -689,17 +1139,13 @@ def edit_graph(operations) -> str:
     if failed:
         lines.append("errors:")
         for r in failed:
-            idx = r.get("index", "?")
-            action = r.get("action", "?")
-            error = r.get("error", "unknown error")
-            lines.append(f"  [{idx}] {action}: {error}")
+            lines.append(f"  [{r.index}] {r.action}: {r.error}")
 
     # Get affected node IDs (created, moved, resized)
     affected_ids = set()
     for r in results:
-        if "error" not in r:
-            if "node_id" in r:
-                affected_ids.add(int(r["node_id"]))
+        if r.error is None and r.node_id is not None:
+            affected_ids.add(int(r.node_id))
             # For move/resize, the node_id is in the original op
 
     # Also track from operations directly
@@ -726,20 +1172,7 @@ def edit_graph(operations) -> str:
             affected_nodes = []
 
             for node in workflow.get("nodes", []):
-                pos = node.get("pos", [0, 0])
-                size = node.get("size", [200, 100])
-
-                # Handle both array and object formats
-                if isinstance(pos, dict):
-                    x, y = pos.get("0", 0), pos.get("1", 0)
-                else:
-                    x, y = pos[0] if len(pos) > 0 else 0, pos[1] if len(pos) > 1 else 0
-                if isinstance(size, dict):
-                    w, h = size.get("0", 200), size.get("1", 100)
-                else:
-                    w, h = size[0] if len(size) > 0 else 200, size[1] if len(size) > 1 else 100
-
-                x, y, w, h = round(x), round(y), round(w), round(h)
+                x, y, w, h = _node_rect(node)
                 title = (node.get("title") or node.get("type") or "").replace(",", ";")
 
                 node_data = {
@@ -804,10 +1237,12 @@ def run_node(node_ids) -> dict:
     Args:
         node_ids: Single node ID (string) or list of node IDs
     """
-    # Normalize to list
+    # Common case: a single node ID
     if isinstance(node_ids, str):
-        node_ids = [node_ids]
-    elif isinstance(node_ids, list):
+        return _run_single(node_ids)
+
+    # Normalize to list
+    if isinstance(node_ids, list):
         node_ids = [str(n) for n in node_ids]
     else:
         node_ids = [str(node_ids)]
@@ -851,31 +1286,13 @@ def run_node(node_ids) -> dict:
         else:
             results.append({"status": "queued", "node_id": node_id})
 
-        if "error" in result:
-            results.append({"error": result["error"], "node_id": node_id_str})
-        else:
-            results.append({
-                "status": "queued",
-                "prompt_id": result.get("prompt_id"),
-                "node_id": node_id_str
-            })
-
-    # Return single result for single input
-    if len(results) == 1:
-        return results[0]
-
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
-    return {
-        "total": len(results),
-        "succeeded": len(succeeded),
-        "failed": len(failed),
-        "results": results
-    }
+    return _batch_response(results)
 
 
 def send_graph_command(action: str, params: dict) -> dict:
     """Send a graph manipulation command to the frontend."""
+    if action not in READ_ONLY_GRAPH_ACTIONS:
+        invalidate_workflow_caches()
     result = make_request("/claude-code/graph-command", method="POST", data={
         "action": action,
         "params": params
@@ -883,6 +1300,187 @@ def send_graph_command(action: str, params: dict) -> dict:
     return result
 
 
+def _validate_op(op: dict, all_nodes: dict, created_types: dict) -> str:
+    """Check an edit_graph operation locally, before anything is sent.
+
+    Args:
+        op: The operation dict
+        all_nodes: Cached object_info
+        created_types: Map of refs created earlier in the same call to their node types
+
+    Returns:
+        Error message, or None if the operation looks valid
+    """
+    action = op.get("action", "")
+
+    if action == "create":
+        node_type = op.get("node_type", "")
+        if not node_type:
+            return "node_type is required"
+        if node_type not in all_nodes:
+            return f"Unknown node type: {node_type}"
+
+    elif action in ("move", "resize", "set"):
+        if not op.get("node_id"):
+            return "node_id is required"
+
+    elif action in ("connect", "disconnect"):
+        from_node = op.get("from_node", "")
+        if not from_node or not op.get("to_node", ""):
+            return "from_node and to_node are required"
+        for key in ("from_slot", "to_slot"):
+            slot = op.get(key, 0)
+            if isinstance(slot, int) and slot < 0:
+                return f"{key} must not be negative"
+        # Output slots are known for nodes created in this call
+        from_slot = op.get("from_slot", 0)
+        from_type = created_types.get(from_node) if isinstance(from_node, str) else None
+        if from_type and isinstance(from_slot, int):
+            outputs = all_nodes[from_type].get("output", [])
+            if from_slot >= len(outputs):
+                return f"from_slot {from_slot} out of range ({from_type} has {len(outputs)} outputs)"
+
+    elif action != "delete":
+        return f"Unknown action: {action}"
+
+    return None
+
+
+def _node_ref_param(value, refs: dict):
+    """Encode a node ID for a graph command, as a $ref token if it names a batch ref."""
+    if value in refs:
+        return {"$ref": value}
+    return str(value)
+
+
+# make_request errors meaning the frontend didn't answer in time. It may still
+# run the commands, so their outcome is unknown rather than failed.
+GRAPH_TIMEOUT_ERRORS = ("Request to ComfyUI timed out", "HTTP error from ComfyUI: 504")
+
+
+def send_graph_commands_batch(commands: list):
+    """Send several graph commands to the frontend in one request.
+
+    Command params may use {"$ref": name} to point at a node created earlier in
+    the batch by a create_node command carrying "ref": name.
+
+    Returns:
+        List of per-command results, or None if the frontend can't run batches.
+        If the request timed out each result is {"status": "unknown", "message"}.
+    """
+    result = send_graph_command("batch", {"commands": commands})
+    if result.get("error") == "Unknown action: batch":
+        return None
+    if "error" in result:
+        if result["error"].startswith(GRAPH_TIMEOUT_ERRORS):
+            message = f"{result['error']}; the frontend may still apply it, check the workflow"
+            return [{"status": "unknown", "message": message} for _ in commands]
+        return [{"error": result["error"]} for _ in commands]
+    results = result.get("results", [])
+    # Pad in case the frontend stopped early
+    results.extend({"error": "No result from frontend"} for _ in range(len(commands) - len(results)))
+    return results
+
+
+def run_graph_commands(commands: list, independent: bool = False) -> list:
+    """Run graph commands in order, batched when the frontend supports it.
+
+    Single commands and older frontends without the batch action get one
+    request per command, with $ref tokens and place_in_view offsets resolved
+    here instead.
+
+    Args:
+        commands: List of {"action", "params", optional "ref"} dicts
+        independent: The commands don't depend on each other's order or
+                     results, so per-command requests may overlap
+    """
+    # A single command gains nothing from batching
+    if len(commands) > 1:
+        results = send_graph_commands_batch(commands)
+        if results is not None:
+            return results
+
+        if independent:
+            # The shared pool caps how many requests wait on the frontend at once
+            return list(_get_executor().map(
+                lambda command: send_graph_command(command["action"], command["params"]),
+                commands
+            ))
+
+    results = []
+    refs = {}
+    viewport_offset = 0  # Horizontal offset for place_in_view nodes
+    for command in commands:
+        params = dict(command["params"])
+        missing = None
+        for key, value in params.items():
+            if isinstance(value, dict) and "$ref" in value:
+                if value["$ref"] not in refs:
+                    missing = value["$ref"]
+                    break
+                params[key] = str(refs[value["$ref"]])
+        if missing is not None:
+            results.append({"error": f"Unknown ref: {missing}"})
+            continue
+
+        action = command["action"]
+        place_in_view = action == "create_node" and params.get("place_in_view")
+        if place_in_view:
+            params["viewport_offset"] = viewport_offset
+
+        r = send_graph_command(action, params)
+        if action == "create_node" and "node_id" in r:
+            if command.get("ref"):
+                refs[command["ref"]] = r["node_id"]
+            if place_in_view:
+                # Use node size + gap for offset (default 300 + 30 if size unknown)
+                node_width = r.get("size", [300, 100])[0] if isinstance(r.get("size"), list) else 300
+                viewport_offset += node_width + 30
+        results.append(r)
+    return results
+
+
+def _fill_command_results(results: list, commands: list, independent: bool = True):
+    """Run graph commands in one batch and put their results into the None slots of results.
+
+    Args:
+        results: Per-item results, with None for each item that has a command
+        commands: The commands for those items, in order
+        independent: Passed to run_graph_commands
+    """
+    if not commands:
+        return
+    outcomes = iter(run_graph_commands(commands, independent=independent))
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = next(outcomes)
+
+
+def _batch_response(results: list) -> dict:
+    """Return a single result as-is, or a summary of several in one pass."""
+    if len(results) == 1:
+        return results[0]
+
+    succeeded = 0
+    unknown = 0
+    for r in results:
+        if "error" in r:
+            continue
+        if r.get("status") == "unknown":
+            unknown += 1
+        else:
+            succeeded += 1
+    summary = {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded - unknown,
+        "results": results
+    }
+    if unknown:
+        summary["unknown"] = unknown
+    return summary
+
+
 def create_node(nodes) -> dict:
     """Create one or more nodes in the workflow.
 
@@ -900,6 +1498,7 @@ def create_node(nodes) -> dict:
         return all_nodes
 
     results = []
+    commands = []
     for node in nodes:
         node_type = node.get("node_type", "")
         pos_x = node.get("pos_x", 100)
@@ -914,26 +1513,17 @@ def create_node(nodes) -> dict:
             results.append({"error": f"Unknown node type: {node_type}", "input": node})
             continue
 
-        result = send_graph_command("create_node", {
+        results.append(None)
+        commands.append({"action": "create_node", "params": {
             "type": node_type,
             "pos_x": pos_x,
             "pos_y": pos_y,
             "title": title
-        })
-        results.append(result)
+        }})
 
-    # Return single result for single input, array for multiple
-    if len(results) == 1:
-        return results[0]
+    _fill_command_results(results, commands)
 
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
-    return {
-        "total": len(results),
-        "succeeded": len(succeeded),
-        "failed": len(failed),
-        "results": results
-    }
+    return _batch_response(results)
 
 
 def delete_nodes(node_ids) -> dict:
@@ -949,23 +1539,16 @@ def delete_nodes(node_ids) -> dict:
         node_ids = [str(node_ids)]
 
     results = []
+    commands = []
     for node_id in node_ids:
-        result = send_graph_command("delete_node", {
+        results.append(None)
+        commands.append({"action": "delete_node", "params": {
             "node_id": str(node_id)
-        })
-        results.append(result)
+        }})
 
-    if len(results) == 1:
-        return results[0]
+    _fill_command_results(results, commands)
 
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
-    return {
-        "total": len(results),
-        "succeeded": len(succeeded),
-        "failed": len(failed),
-        "results": results
-    }
+    return _batch_response(results)
 
 
 def set_node_property(properties) -> dict:
@@ -980,6 +1563,7 @@ def set_node_property(properties) -> dict:
         properties = [properties]
 
     results = []
+    commands = []
     for prop in properties:
         node_id = prop.get("node_id", "")
         property_name = prop.get("property_name", "")
@@ -989,27 +1573,16 @@ def set_node_property(properties) -> dict:
             results.append({"error": "node_id and property_name are required", "input": prop})
             continue
 
-        result = send_graph_command("set_node_property", {
+        results.append(None)
+        commands.append({"action": "set_node_property", "params": {
             "node_id": str(node_id),
             "property_name": property_name,
             "value": value
-        })
-        results.append(result)
+        }})
 
-    # Return single result for single input, array for multiple
-    if len(results) == 1:
-        return results[0]
+    _fill_command_results(results, commands)
 
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
-    return {
-        "total": len(results),
-        "succeeded": len(succeeded),
-        "failed": len(failed),
-        "results": results
-    }
-
-    return result
+    return _batch_response(results)
 
 
 def connect_nodes(connections) -> dict:
@@ -1024,6 +1597,7 @@ def connect_nodes(connections) -> dict:
         connections = [connections]
 
     results = []
+    commands = []
     for conn in connections:
         from_node_id = conn.get("from_node_id", "")
         from_slot = conn.get("from_slot", 0)
@@ -1034,25 +1608,17 @@ def connect_nodes(connections) -> dict:
             results.append({"error": "from_node_id and to_node_id are required", "input": conn})
             continue
 
-        result = send_graph_command("connect_nodes", {
+        results.append(None)
+        commands.append({"action": "connect_nodes", "params": {
             "from_node_id": str(from_node_id),
             "from_slot": from_slot,
             "to_node_id": str(to_node_id),
             "to_slot": to_slot
-        })
-        results.append(result)
+        }})
 
-    if len(results) == 1:
-        return results[0]
+    _fill_command_results(results, commands)
 
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
-    return {
-        "total": len(results),
-        "succeeded": len(succeeded),
-        "failed": len(failed),
-        "results": results
-    }
+    return _batch_response(results)
 
 
 def disconnect_nodes(disconnections) -> dict:
@@ -1067,6 +1633,7 @@ def disconnect_nodes(disconnections) -> dict:
         disconnections = [disconnections]
 
     results = []
+    commands = []
     for disc in disconnections:
         from_node_id = disc.get("from_node_id", "")
         from_slot = disc.get("from_slot", 0)
@@ -1077,25 +1644,17 @@ def disconnect_nodes(disconnections) -> dict:
             results.append({"error": "from_node_id and to_node_id are required", "input": disc})
             continue
 
-        result = send_graph_command("disconnect_nodes", {
+        results.append(None)
+        commands.append({"action": "disconnect_nodes", "params": {
             "from_node_id": str(from_node_id),
             "from_slot": from_slot,
             "to_node_id": str(to_node_id),
             "to_slot": to_slot
-        })
-        results.append(result)
+        }})
 
-    if len(results) == 1:
-        return results[0]
+    _fill_command_results(results, commands)
 
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
-    return {
-        "total": len(results),
-        "succeeded": len(succeeded),
-        "failed": len(failed),
-        "results": results
-    }
+    return _batch_response(results)
 
 
 def move_nodes(moves) -> dict:
@@ -1110,152 +1669,133 @@ def move_nodes(moves) -> dict:
         moves = [moves]
 
     results = []
+    commands = []
+    # Relative moves depend on where earlier moves put their reference nodes
+    independent = True
     for move in moves:
         node_id = move.get("node_id", "")
         if not node_id:
             results.append({"error": "node_id is required", "input": move})
             continue
 
-        result = send_graph_command("move_node", {
-            "node_id": str(node_id),
+        relative_to = move.get("relative_to")
+        if relative_to:
+            relative_to = str(relative_to)
+            independent = False
+        else:
+            relative_to = None
+
+        results.append(None)
+        commands.append({"action": "move_node", "params": {
+            "node_id": node_id if isinstance(node_id, str) else str(node_id),
             "x": move.get("x"),
             "y": move.get("y"),
-            "relative_to": str(move.get("relative_to")) if move.get("relative_to") else None,
+            "relative_to": relative_to,
             "direction": move.get("direction"),
             "gap": move.get("gap", 30),
             "width": move.get("width"),
             "height": move.get("height")
-        })
-        results.append(result)
+        }})
 
-    if len(results) == 1:
-        return results[0]
-
-    succeeded = [r for r in results if "error" not in r]
-    failed = [r for r in results if "error" in r]
-    return {
-        "total": len(results),
-        "succeeded": len(succeeded),
-        "failed": len(failed),
-        "results": results
-    }
+    _fill_command_results(results, commands, independent=independent)
 
+    return _batch_response(results)
 
-def get_node_info(node_id: str) -> str:
-    """Get detailed info about a specific node in the workflow in compact TOON-like format."""
-    workflow_data = get_workflow()
 
-    if "error" in workflow_data or "message" in workflow_data:
-        return f"error: {workflow_data.get('error') or workflow_data.get('message')}"
+def get_node_info(node_id: int) -> str:
+    """Get detailed info about a specific node in the workflow in compact TOON-like format.
 
-    workflow = workflow_data.get("workflow", {})
-    node_id_str = str(node_id)
-    try:
-        node_id_int = int(node_id)
-    except ValueError:
-        return f"error: invalid node_id '{node_id}'"
+    Args:
+        node_id: Integer node ID (normalized by parse_node_id at the MCP boundary)
+    """
+    workflow, error = _load_workflow()
+    if error:
+        return f"error: {error}"
 
     # Handle graph serialize format
     if "nodes" in workflow:
-        for node in workflow.get("nodes", []):
-            if node.get("id") == node_id_int:
-                node_type = node.get("type")
-                title = node.get("title") or node_type
-                pos = node.get("pos", [0, 0])
-                size = node.get("size", [200, 100])
-
-                # Handle array/dict formats
-                if isinstance(pos, dict):
-                    x, y = pos.get("0", 0), pos.get("1", 0)
-                else:
-                    x, y = pos[0] if len(pos) > 0 else 0, pos[1] if len(pos) > 1 else 0
-                if isinstance(size, dict):
-                    w, h = size.get("0", 200), size.get("1", 100)
-                else:
-                    w, h = size[0] if len(size) > 0 else 200, size[1] if len(size) > 1 else 100
-
-                lines = []
-                lines.append(f"node {node_id_int}: {title}")
-                lines.append(f"type: {node_type}")
-                lines.append(f"pos: {round(x)},{round(y)} size: {round(w)}x{round(h)}")
-
-                # Get type info for input/output details
-                type_info = {}
-                all_nodes = get_object_info_cached()
-                if "error" not in all_nodes and node_type in all_nodes:
-                    type_info = all_nodes[node_type]
-
-                if type_info:
-                    cat = type_info.get("category", "")
-                    desc = type_info.get("description", "")
-                    if cat:
-                        lines.append(f"category: {cat}")
-                    if desc:
-                        lines.append(f"desc: {desc[:100]}")
-
-                    # Inputs from type info
-                    input_info = type_info.get("input", {})
-                    inputs = []
-                    for group in ["required", "optional"]:
-                        if group in input_info:
-                            req_marker = "*" if group == "required" else ""
-                            for inp_name, inp_def in input_info[group].items():
-                                if isinstance(inp_def, list) and len(inp_def) > 0:
-                                    inp_type = inp_def[0] if isinstance(inp_def[0], str) else type(inp_def[0]).__name__
-                                    inputs.append(f"{inp_name}{req_marker}:{inp_type}")
-                    if inputs:
-                        lines.append(f"inputs: {','.join(inputs)}")
-
-                    # Outputs from type info
-                    outputs = type_info.get("output", [])
-                    output_names = type_info.get("output_name", outputs)
-                    if outputs:
-                        out_parts = []
-                        for i, out_type in enumerate(outputs):
-                            out_name = output_names[i] if i < len(output_names) else out_type
-                            out_parts.append(f"{out_name}:{out_type}")
-                        lines.append(f"outputs: {','.join(out_parts)}")
-
-                # Current connections (from workflow node data)
-                node_inputs = node.get("inputs", [])
-                if node_inputs:
-                    conn_parts = []
-                    for inp in node_inputs:
-                        if isinstance(inp, dict) and inp.get("link"):
-                            inp_name = inp.get("name", "?")
-                            link_id = inp.get("link")
-                            conn_parts.append(f"{inp_name}=link{link_id}")
-                    if conn_parts:
-                        lines.append(f"connected_inputs: {','.join(conn_parts)}")
-
-                node_outputs = node.get("outputs", [])
-                if node_outputs:
-                    conn_parts = []
-                    for out in node_outputs:
-                        if isinstance(out, dict) and out.get("links"):
-                            out_name = out.get("name", "?")
-                            links = out.get("links", [])
-                            conn_parts.append(f"{out_name}->links{links}")
-                    if conn_parts:
-                        lines.append(f"connected_outputs: {','.join(conn_parts)}")
-
-                # Widget values
-                widgets = node.get("widgets_values")
-                if widgets:
-                    # Compact widget display - truncate long values
-                    widget_strs = []
-                    for i, val in enumerate(widgets):
-                        val_str = str(val)
-                        if len(val_str) > 50:
-                            val_str = val_str[:47] + "..."
-                        widget_strs.append(val_str.replace(",", ";").replace("\n", "\\n"))
-                    lines.append(f"widgets[{len(widgets)}]: {','.join(widget_strs)}")
-
-                return "\n".join(lines)
-
-        return f"error: node {node_id} not found in workflow"
-
-    # Handle API format
+        node = _workflow_node(workflow, node_id)
+        if node is None:
+            return f"error: node {node_id} not found in workflow"
+        node_type = node.get("type")
+        title = node.get("title") or node_type
+        x, y, w, h = _node_rect(node)
+
+        lines = []
+        lines.append(f"node {node_id}: {title}")
+        lines.append(f"type: {node_type}")
+        lines.append(f"pos: {x},{y} size: {w}x{h}")
+
+        # Get type info for input/output details
+        type_info = {}
+        all_nodes = get_object_info_cached()
+        if "error" not in all_nodes and node_type in all_nodes:
+            type_info = all_nodes[node_type]
+
+        if type_info:
+            cat = type_info.get("category", "")
+            desc = type_info.get("description", "")
+            if cat:
+                lines.append(f"category: {cat}")
+            if desc:
+                lines.append(f"desc: {desc[:100]}")
+
+            # Inputs from type info
+            inputs = _object_info_input_types.get(node_type)
+            if inputs is None:
+                inputs = _format_input_types(type_info)
+            if inputs:
+                lines.append(f"inputs: {inputs}")
+
+            # Outputs from type info
+            outputs = type_info.get("output", [])
+            output_names = type_info.get("output_name", outputs)
+            if outputs:
+                out_parts = []
+                for i, out_type in enumerate(outputs):
+                    out_name = output_names[i] if i < len(output_names) else out_type
+                    out_parts.append(f"{out_name}:{out_type}")
+                lines.append(f"outputs: {','.join(out_parts)}")
+
+        # Current connections (from workflow node data)
+        node_inputs = node.get("inputs", [])
+        if node_inputs:
+            conn_parts = []
+            for inp in node_inputs:
+                if isinstance(inp, dict) and inp.get("link"):
+                    inp_name = inp.get("name", "?")
+                    link_id = inp.get("link")
+                    conn_parts.append(f"{inp_name}=link{link_id}")
+            if conn_parts:
+                lines.append(f"connected_inputs: {','.join(conn_parts)}")
+
+        node_outputs = node.get("outputs", [])
+        if node_outputs:
+            conn_parts = []
+            for out in node_outputs:
+                if isinstance(out, dict) and out.get("links"):
+                    out_name = out.get("name", "?")
+                    links = out.get("links", [])
+                    conn_parts.append(f"{out_name}->links{links}")
+            if conn_parts:
+                lines.append(f"connected_outputs: {','.join(conn_parts)}")
+
+        # Widget values
+        widgets = node.get("widgets_values")
+        if widgets:
+            # Compact widget display - truncate long values
+            widget_strs = []
+            for i, val in enumerate(widgets):
+                val_str = str(val)
+                if len(val_str) > 50:
+                    val_str = val_str[:47] + "..."
+                widget_strs.append(val_str.replace(",", ";").replace("\n", "\\n"))
+            lines.append(f"widgets[{len(widgets)}]: {','.join(widget_strs)}")
+
+        return "\n".join(lines)
+
+    # Handle API format (keys are strings)
+    node_id_str = str(node_id)
     if node_id_str in workflow:
         node_data = workflow[node_id_str]
         node_type = node_data.get("class_type", "?")
@@ -1287,87 +1827,95 @@ def summarize_workflow() -> str:
           from:slot->to:slot,TYPE
           ...
     """
-    workflow_data = get_workflow()
-
-    if "error" in workflow_data or "message" in workflow_data:
-        return f"error: {workflow_data.get('error') or workflow_data.get('message')}"
-
-    workflow = workflow_data.get("workflow", {})
+    workflow, error = _load_workflow()
+    if error:
+        return f"error: {error}"
 
     if "nodes" not in workflow:
         return "error: No nodes in workflow"
 
-    lines = []
-    nodes = []
-    min_x, min_y = float('inf'), float('inf')
-    max_x, max_y = float('-inf'), float('-inf')
-
-    # Graph serialize format
-    for node in workflow.get("nodes", []):
-        pos = node.get("pos", [0, 0])
-        size = node.get("size", [200, 100])
-
-        # Handle both array and object formats for pos
-        if isinstance(pos, dict):
-            x, y = pos.get("0", 0), pos.get("1", 0)
-        else:
-            x, y = pos[0] if len(pos) > 0 else 0, pos[1] if len(pos) > 1 else 0
+    # Repeated summaries of an unchanged workflow are served from the cache
+    key = _workflow_hash(workflow)
+    summary = _summary_cache.get(key)
+    if summary is None:
+        summary = _build_workflow_summary(workflow)
+        if len(_summary_cache) >= SUMMARY_CACHE_SIZE:
+            _summary_cache.clear()
+        _summary_cache[key] = summary
+    return summary
+
+
+def _node_rect(node: dict) -> tuple:
+    """Get a graph node's rounded (x, y, w, h), accepting array or object pos/size."""
+    pos = node.get("pos", [0, 0])
+    size = node.get("size", [200, 100])
+
+    # Handle both array and object formats for pos
+    if isinstance(pos, dict):
+        x, y = pos.get("0", 0), pos.get("1", 0)
+    else:
+        x, y = pos[0] if len(pos) > 0 else 0, pos[1] if len(pos) > 1 else 0
 
-        # Handle both array and object formats for size
-        if isinstance(size, dict):
-            w, h = size.get("0", 200), size.get("1", 100)
-        else:
-            w, h = size[0] if len(size) > 0 else 200, size[1] if len(size) > 1 else 100
+    # Handle both array and object formats for size
+    if isinstance(size, dict):
+        w, h = size.get("0", 200), size.get("1", 100)
+    else:
+        w, h = size[0] if len(size) > 0 else 200, size[1] if len(size) > 1 else 100
 
-        x, y, w, h = round(x), round(y), round(w), round(h)
+    return round(x), round(y), round(w), round(h)
 
-        min_x = min(min_x, x)
-        min_y = min(min_y, y)
-        max_x = max(max_x, x + w)
-        max_y = max(max_y, y + h)
 
-        # Escape commas in title/type
-        node_type = (node.get("type") or "").replace(",", ";")
-        title = (node.get("title") or "").replace(",", ";")
+def _build_workflow_summary(workflow: dict) -> str:
+    """Build the TOON summary text for a graph-format workflow."""
+    lines = []
 
-        nodes.append({
-            "id": node.get("id"),
-            "type": node_type,
-            "title": title,
-            "x": x, "y": y, "w": w, "h": h
-        })
+    # Graph serialize format: (id, type, title, x, y, w, h) per node,
+    # with commas in title/type escaped
+    nodes = [
+        (
+            node.get("id"),
+            (node.get("type") or "").replace(",", ";"),
+            (node.get("title") or "").replace(",", ";"),
+            *_node_rect(node),
+        )
+        for node in workflow.get("nodes", [])
+    ]
 
     # Sort by id for consistent output
-    nodes.sort(key=lambda n: int(n["id"]) if str(n["id"]).isdigit() else 0)
+    nodes.sort(key=lambda n: int(n[0]) if str(n[0]).isdigit() else 0)
 
     # Canvas bounds
     if nodes:
-        lines.append(f"canvas: {round(min_x)},{round(min_y)} to {round(max_x)},{round(max_y)}")
+        min_x = min(n[3] for n in nodes)
+        min_y = min(n[4] for n in nodes)
+        max_x = max(n[3] + n[5] for n in nodes)
+        max_y = max(n[4] + n[6] for n in nodes)
+        lines.append(f"canvas: {min_x},{min_y} to {max_x},{max_y}")
 
     # Nodes section
     lines.append(f"nodes[{len(nodes)}]{{id,type,title,x,y,w,h}}:")
-    for n in nodes:
-        lines.append(f"  {n['id']},{n['type']},{n['title']},{n['x']},{n['y']},{n['w']},{n['h']}")
+    lines.extend("  " + ",".join(map(str, n)) for n in nodes)
 
     # Connections section
     links = workflow.get("links", [])
     if links:
         lines.append(f"connections[{len(links)}]{{from:slot->to:slot,type}}:")
-        for link in links:
-            if len(link) >= 6:
-                # link format: [link_id, from_node, from_slot, to_node, to_slot, type]
-                lines.append(f"  {link[1]}:{link[2]}->{link[3]}:{link[4]},{link[5]}")
+        # link format: [link_id, from_node, from_slot, to_node, to_slot, type]
+        lines.extend(
+            f"  {link[1]}:{link[2]}->{link[3]}:{link[4]},{link[5]}"
+            for link in links if len(link) >= 6
+        )
 
     # Collision detection - O(n²) but fast for typical workflow sizes
     collisions = []
-    for i, a in enumerate(nodes):
-        for b in nodes[i+1:]:
+    for i, (a_id, _, _, ax, ay, aw, ah) in enumerate(nodes):
+        for b_id, _, _, bx, by, bw, bh in nodes[i+1:]:
             # Check rectangle intersection
             # Two rects overlap if they overlap on both axes
-            x_overlap = max(0, min(a["x"] + a["w"], b["x"] + b["w"]) - max(a["x"], b["x"]))
-            y_overlap = max(0, min(a["y"] + a["h"], b["y"] + b["h"]) - max(a["y"], b["y"]))
+            x_overlap = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+            y_overlap = max(0, min(ay + ah, by + bh) - max(ay, by))
             if x_overlap > 0 and y_overlap > 0:
-                collisions.append(f"  {a['id']}<->{b['id']} (overlap: {x_overlap}x{y_overlap})")
+                collisions.append(f"  {a_id}<->{b_id} (overlap: {x_overlap}x{y_overlap})")
 
     if collisions:
         lines.append(f"collisions[{len(collisions)}]:")
@@ -1388,13 +1936,10 @@ def get_layout_summary() -> str:
         id,title,x,y,w,h
         ...
     """
-    workflow_data = get_workflow()
-
-    if "error" in workflow_data or "message" in workflow_data:
+    workflow, error = _load_workflow()
+    if error:
         return "error: Could not get workflow layout"
 
-    workflow = workflow_data.get("workflow", {})
-
     if "nodes" not in workflow:
         return "error: No nodes in workflow"
 
@@ -1403,23 +1948,7 @@ def get_layout_summary() -> str:
     max_x, max_y = float('-inf'), float('-inf')
 
     for node in workflow.get("nodes", []):
-        pos = node.get("pos", [0, 0])
-        size = node.get("size", [200, 100])  # Default size if not available
-
-        # Handle both array and object formats for pos
-        if isinstance(pos, dict):
-            x, y = pos.get("0", 0), pos.get("1", 0)
-        else:
-            x, y = pos[0] if len(pos) > 0 else 0, pos[1] if len(pos) > 1 else 0
-
-        # Handle both array and object formats for size
-        if isinstance(size, dict):
-            w, h = size.get("0", 200), size.get("1", 100)
-        else:
-            w, h = size[0] if len(size) > 0 else 200, size[1] if len(size) > 1 else 100
-
-        # Round for cleaner output
-        x, y, w, h = round(x), round(y), round(w), round(h)
+        x, y, w, h = _node_rect(node)
 
         # Track canvas bounds
         min_x = min(min_x, x)
@@ -1460,66 +1989,8 @@ def get_layout_summary() -> str:
     return "\n".join(lines)
 
 
-def view_image(node_id: str = None, image_index: int = 0) -> dict:
-    """View an image from a Preview Image or Save Image node.
-
-    Args:
-        node_id: The ID of the Preview Image or Save Image node.
-                 If not provided, finds the first/most recent image node.
-        image_index: Which image to view if the node has multiple (0-based). Default: 0
-
-    Returns:
-        Image data as base64 with metadata, or error message.
-    """
-    # Get the current workflow to find image nodes
-    workflow_data = get_workflow()
-    if "error" in workflow_data:
-        return workflow_data
-
-    workflow = workflow_data.get("workflow", {})
-
-    # Find image nodes (Preview Image, Save Image, etc.)
-    image_nodes = []
-    if "nodes" in workflow:
-        for node in workflow.get("nodes", []):
-            node_type = node.get("type", "")
-            if any(t in node_type.lower() for t in ["preview", "saveimage", "save image"]):
-                image_nodes.append({
-                    "id": node.get("id"),
-                    "type": node_type,
-                    "title": node.get("title") or node_type
-                })
-
-    if not image_nodes:
-        return {"error": "No Preview Image or Save Image nodes found in workflow"}
-
-    # Find target node
-    target_node = None
-    if node_id:
-        node_id_int = int(node_id)
-        for n in image_nodes:
-            if n["id"] == node_id_int:
-                target_node = n
-                break
-        if not target_node:
-            return {
-                "error": f"Node {node_id} is not an image node",
-                "available_image_nodes": image_nodes
-            }
-    else:
-        # Use the first image node
-        target_node = image_nodes[0]
-
-    # Get history to find the actual image files
-    history = get_history()
-    if "error" in history:
-        return {"error": "Could not get history. Run the workflow first to generate images."}
-
-    # Search through history for outputs from this node
-    # Sort by timestamp (most recent first) to get the latest image
-    target_node_id = str(target_node["id"])
-    image_info = None
-
+def _find_history_image(history: dict, target_node_id: str, image_index: int) -> dict:
+    """Find the most recent image output of a node in prompt history."""
     # Build list with timestamps for sorting
     history_items = []
     for prompt_id, prompt_data in history.items():
@@ -1546,14 +2017,113 @@ def view_image(node_id: str = None, image_index: int = 0) -> dict:
             if "images" in node_outputs:
                 images = node_outputs["images"]
                 if images and len(images) > image_index:
-                    image_info = images[image_index]
-                    break
+                    return images[image_index]
+    return None
+
+
+def _image_node_entry(node: dict) -> dict:
+    """Compact id/type/title record for an image output node."""
+    node_type = node.get("type") or ""
+    return {
+        "id": node.get("id"),
+        "type": node_type,
+        "title": node.get("title") or node_type
+    }
+
+
+def _image_nodes(nodes: list) -> list:
+    """List the Preview Image / Save Image nodes of a workflow."""
+    return [
+        _image_node_entry(node) for node in nodes
+        if _IMAGE_TYPE_RE.search(node.get("type") or "")
+    ]
+
+
+# Read size for streaming base64; a multiple of 3 so chunks encode without padding
+BASE64_CHUNK_SIZE = 3 << 16
+
+
+def _read_base64(response) -> bytes:
+    """Read a response body and return it base64-encoded, as ASCII bytes.
+
+    The body is encoded chunk by chunk so the full raw image is never held
+    alongside its (4/3 larger) encoding. The result stays bytes: it is written
+    to stdout as-is, so decoding it to str would only add copies.
+    """
+    parts = []
+    pending = b""
+    while True:
+        chunk = response.read(BASE64_CHUNK_SIZE)
+        if not chunk:
+            break
+        if pending:
+            chunk = pending + chunk
+        # Carry any bytes past the last multiple of 3 into the next chunk
+        cut = len(chunk) - len(chunk) % 3
+        pending = chunk[cut:]
+        parts.append(binascii.b2a_base64(chunk[:cut], newline=False))
+    if pending:
+        parts.append(binascii.b2a_base64(pending, newline=False))
+    return b"".join(parts)
+
+
+def view_image(node_id: int = None, image_index: int = 0) -> dict:
+    """View an image from a Preview Image or Save Image node.
+
+    Args:
+        node_id: The integer ID of the Preview Image or Save Image node.
+                 If not provided, finds the first/most recent image node.
+        image_index: Which image to view if the node has multiple (0-based). Default: 0
+
+    Returns:
+        Image data as base64 (ASCII bytes in "base64_data") with metadata, or error message.
+    """
+    # Get the current workflow to find image nodes
+    workflow, error = _load_workflow()
+    if error:
+        return {"error": error}
+
+    nodes = workflow.get("nodes", [])
+
+    # Find target node; the full list of image nodes is only built for errors
+    if node_id is not None:
+        node = _workflow_node(workflow, node_id)
+        if node is None or not _IMAGE_TYPE_RE.search(node.get("type") or ""):
+            image_nodes = _image_nodes(nodes)
+            if not image_nodes:
+                return {"error": "No Preview Image or Save Image nodes found in workflow"}
+            return {
+                "error": f"Node {node_id} is not an image node",
+                "available_image_nodes": image_nodes
+            }
+        target_node = _image_node_entry(node)
+    else:
+        # Use the first image node
+        target_node = next(
+            (_image_node_entry(n) for n in nodes if _IMAGE_TYPE_RE.search(n.get("type") or "")),
+            None
+        )
+        if target_node is None:
+            return {"error": "No Preview Image or Save Image nodes found in workflow"}
+
+    # Get recent history first; most lookups are for an image that was just
+    # generated, so the full history is only fetched when that misses
+    target_node_id = str(target_node["id"])
+    history = get_history(max_items=RECENT_HISTORY_ITEMS)
+    if "error" in history:
+        return {"error": "Could not get history. Run the workflow first to generate images."}
+
+    image_info = _find_history_image(history, target_node_id, image_index)
+    if not image_info and len(history) >= RECENT_HISTORY_ITEMS:
+        history = get_history()
+        if "error" not in history:
+            image_info = _find_history_image(history, target_node_id, image_index)
 
     if not image_info:
         return {
             "error": f"No images found for node {target_node_id}. Run the workflow first.",
             "node": target_node,
-            "available_image_nodes": image_nodes
+            "available_image_nodes": _image_nodes(nodes)
         }
 
     # Fetch the actual image
@@ -1561,20 +2131,22 @@ def view_image(node_id: str = None, image_index: int = 0) -> dict:
     subfolder = image_info.get("subfolder", "")
     img_type = image_info.get("type", "output")  # 'output' for Save Image, 'temp' for Preview Image
 
-    params = f"filename={urllib.parse.quote(filename)}&type={img_type}"
+    query = {"filename": filename, "type": img_type}
     if subfolder:
-        params += f"&subfolder={urllib.parse.quote(subfolder)}"
+        query["subfolder"] = subfolder
+    params = urllib.parse.urlencode(query)
 
-    url = f"{get_comfyui_url()}/view?{params}"
+    url = f"{get_base_url()}/view?{params}"
 
     try:
-        req = urllib.request.Request(url, method="GET")
-        with urllib.request.urlopen(req, timeout=30) as response:
-            image_data = response.read()
+        with http_open("GET", url, timeout=30) as response:
+            if response.status >= 400:
+                response.read()  # Drain so the connection can be reused
+                return {"error": f"Failed to fetch image: HTTP {response.status}"}
             content_type = response.headers.get("Content-Type", "image/png")
 
             # Convert to base64
-            base64_data = base64.b64encode(image_data).decode("utf-8")
+            base64_data = _read_base64(response)
 
             # Determine media type
             if "jpeg" in content_type or "jpg" in content_type:
@@ -1594,8 +2166,6 @@ def view_image(node_id: str = None, image_index: int = 0) -> dict:
                 "base64_data": base64_data
             }
 
-    except urllib.error.HTTPError as e:
-        return {"error": f"Failed to fetch image: HTTP {e.code}"}
     except Exception as e:
         return {"error": f"Failed to fetch image: {str(e)}"}
 
@@ -1604,9 +2174,36 @@ def view_image(node_id: str = None, image_index: int = 0) -> dict:
 
 COMFY_REGISTRY_API = "https://api.comfy.org"
 
+# Successful registry responses keyed by (endpoint, sorted params), stored as
+# (fetch time, result). Searches and lookups repeat within a session, e.g.
+# search_custom_nodes followed by install_custom_node for the same node.
+_registry_cache = {}
+REGISTRY_CACHE_TTL = 300  # 5 minutes
+REGISTRY_CACHE_SIZE = 64
+REGISTRY_ATTEMPTS = 2  # Connection errors and 5xx responses are retried
+REGISTRY_RETRY_DELAY = 0.2  # seconds, multiplied by the attempt number
+
+# Registry pages searched at most when filtering out installed nodes
+SEARCH_MAX_PAGES = 5
+
+
+# ComfyUI directories found so far: "custom_nodes" / "models" -> path. Only
+# found paths are kept, so a directory that appears later is still picked up
+_comfyui_dirs = {}
+
 
 def get_comfyui_custom_nodes_dir() -> str:
-    """Get the ComfyUI custom_nodes directory."""
+    """Get the ComfyUI custom_nodes directory (looked up until found, then cached)."""
+    path = _comfyui_dirs.get("custom_nodes")
+    if path is None:
+        path = _find_custom_nodes_dir()
+        if path:
+            _comfyui_dirs["custom_nodes"] = path
+    return path
+
+
+def _find_custom_nodes_dir() -> str:
+    """Search for the ComfyUI custom_nodes directory."""
     import os
 
     # From the plugin directory (we're inside custom_nodes)
@@ -1633,47 +2230,222 @@ def get_comfyui_custom_nodes_dir() -> str:
     return None
 
 
+def _project_registry_node(node: dict) -> dict:
+    """Keep only the registry search fields the node tools use."""
+    node_id = node.get("id") or ""
+    publisher = node.get("publisher")
+    return {
+        "id": node_id,
+        "name": node.get("name", node_id),
+        "author": publisher.get("name", "") if isinstance(publisher, dict) else "",
+        "description": node.get("description") or "",
+        "repository": node.get("repository") or "",
+        "stars": node.get("github_stars", 0),
+        "downloads": node.get("downloads", 0),
+    }
+
+
 def query_registry(endpoint: str, params: dict = None) -> dict:
-    """Query the ComfyUI Registry API."""
+    """Query the ComfyUI Registry API.
+
+    /nodes/search records are reduced to the fields in _project_registry_node.
+    Successful responses are cached for REGISTRY_CACHE_TTL seconds and shared,
+    so callers must treat them as read-only. Errors are never cached.
+    """
+    import time
     import urllib.parse
 
+    key = (endpoint, tuple(sorted((params or {}).items())))
+    cached = _registry_cache.get(key)
+    if cached is not None and time.time() - cached[0] < REGISTRY_CACHE_TTL:
+        return cached[1]
+
     url = f"{COMFY_REGISTRY_API}{endpoint}"
     if params:
         url += "?" + urllib.parse.urlencode(params)
 
+    headers = {"User-Agent": "ComfyPilot/1.0", "Accept-Encoding": "gzip"}
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": "ComfyPilot/1.0"})
-        with urllib.request.urlopen(req, timeout=10) as response:
-            return json.loads(response.read().decode())
-    except urllib.error.HTTPError as e:
-        return {"error": f"Registry API error: {e.code} {e.reason}"}
+        # Pooled keep-alive connection, so a search followed by an install
+        # reuses the TLS session; transient failures are retried once
+        for attempt in range(REGISTRY_ATTEMPTS):
+            try:
+                with http_open("GET", url, headers=headers, timeout=10) as response:
+                    raw = response.read()
+                    status, reason = response.status, response.reason
+                    encoding = response.getheader("Content-Encoding", "").lower()
+            except socket.timeout:
+                raise  # Already waited the full timeout
+            except (OSError, http.client.HTTPException):
+                if attempt == REGISTRY_ATTEMPTS - 1:
+                    raise
+            else:
+                if status < 500 or attempt == REGISTRY_ATTEMPTS - 1:
+                    break
+            time.sleep(REGISTRY_RETRY_DELAY * (attempt + 1))
+
+        if status >= 400:
+            return {"error": f"Registry API error: {status} {reason}"}
+        if encoding == "gzip":
+            raw = gzip.decompress(raw)
+        result = json.loads(raw)
+        if endpoint == "/nodes/search" and isinstance(result, dict) and "nodes" in result:
+            result["nodes"] = [_project_registry_node(n) for n in result["nodes"] if isinstance(n, dict)]
+        if isinstance(result, dict) and "error" not in result:
+            _registry_cache.pop(key, None)
+            if len(_registry_cache) >= REGISTRY_CACHE_SIZE:
+                # pop, not del: a concurrent search may have evicted it already
+                _registry_cache.pop(next(iter(_registry_cache)), None)
+            _registry_cache[key] = (time.time(), result)
+        return result
     except Exception as e:
         return {"error": f"Failed to query registry: {str(e)}"}
 
 
+def _git_env() -> dict:
+    """Environment for git subprocesses.
+
+    Disables credential prompts, which would otherwise hang until the timeout
+    on private or mistyped URLs, and skips Git LFS downloads during clone and
+    pull; _pull_lfs_files fetches them afterwards for repos that use LFS.
+    """
+    import os
+
+    env = dict(os.environ)
+    env["GIT_TERMINAL_PROMPT"] = "0"
+    env["GIT_LFS_SKIP_SMUDGE"] = "1"
+    return env
+
+
+def _pull_lfs_files(git: str, repo_path: str) -> str:
+    """Fetch the Git LFS files of a clone made with GIT_LFS_SKIP_SMUDGE.
+
+    Returns:
+        None if the repo doesn't use LFS or its files were fetched; otherwise
+        a note saying the LFS files are still pointer files.
+    """
+    import subprocess
+    import os
+
+    try:
+        with open(os.path.join(repo_path, ".gitattributes"), encoding="utf-8", errors="replace") as f:
+            if "filter=lfs" not in f.read():
+                return None
+    except OSError:
+        return None
+
+    try:
+        result = subprocess.run(
+            [git, "lfs", "pull"],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+            timeout=600,
+            env=_git_env()
+        )
+        if result.returncode == 0:
+            return None
+        reason = (result.stderr.strip().splitlines() or ["git lfs pull failed"])[0]
+    except subprocess.TimeoutExpired:
+        reason = "git lfs pull timed out after 10 minutes"
+    return (f"This node stores some files with Git LFS and they were not downloaded ({reason})."
+            f" Install git-lfs and run 'git lfs pull' in {repo_path}.")
+
+
+# Executables found by _resolve_bin: name -> path. Misses aren't cached, so a
+# tool installed while the server runs is found on the next call
+_resolved_bins = {}
+
+
+def _resolve_bin(name: str) -> str:
+    """Find an executable on PATH or in common user install locations."""
+    import os
+    import shutil
+
+    path = _resolved_bins.get(name)
+    if path:
+        return path
+    path = shutil.which(name)
+    if not path:
+        # pip --user, Homebrew and /usr/local installs are often missing from
+        # the PATH that MCP clients launch the server with
+        for directory in ("~/.local/bin", "/usr/local/bin", "/opt/homebrew/bin"):
+            candidate = os.path.join(os.path.expanduser(directory), name)
+            if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                path = candidate
+                break
+    if path:
+        _resolved_bins[name] = path
+    return path
+
+
+# Last get_installed_nodes scan, keyed by (custom_nodes dir, its mtime)
+_installed_nodes_cache = {"key": None, "data": None}
+
+
+def invalidate_installed_nodes():
+    """Forget the cached custom_nodes scan after installing or removing a node."""
+    _installed_nodes_cache["key"] = None
+
+
 def get_installed_nodes() -> dict:
-    """Get a map of installed custom nodes by scanning the custom_nodes directory."""
+    """Get a map of installed custom nodes by scanning the custom_nodes directory.
+
+    The scan is reused until the directory's mtime changes (an entry was added,
+    removed or renamed). Callers must not modify the returned map.
+    """
     import os
 
     custom_nodes_dir = get_comfyui_custom_nodes_dir()
     if not custom_nodes_dir:
         return {}
 
+    try:
+        key = (custom_nodes_dir, os.stat(custom_nodes_dir).st_mtime_ns)
+    except OSError:
+        key = None
+    if key is not None and _installed_nodes_cache["key"] == key:
+        return _installed_nodes_cache["data"]
+
     installed = {}
-    for name in os.listdir(custom_nodes_dir):
-        path = os.path.join(custom_nodes_dir, name)
-        if os.path.isdir(path) and not name.startswith(".") and not name.startswith("__"):
+    # scandir reports entry types from the directory read itself, so only
+    # symlinks and the .git probe cost an extra stat
+    with os.scandir(custom_nodes_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith((".", "__")) or not entry.is_dir():
+                continue
             # Check if it's a git repo
-            is_git = os.path.isdir(os.path.join(path, ".git"))
+            is_git = os.path.isdir(os.path.join(entry.path, ".git"))
             installed[name.lower()] = {
                 "name": name,
-                "path": path,
+                "path": entry.path,
                 "is_git": is_git
             }
 
+    # Data before key, so a concurrent reader never pairs the new key with old data
+    _installed_nodes_cache["data"] = installed
+    _installed_nodes_cache["key"] = key
     return installed
 
 
+def _find_installed_node(node_id: str) -> dict:
+    """Find an installed custom node by folder name.
+
+    Tries an exact (case-insensitive) match first, then the first folder whose
+    name contains node_id.
+
+    Returns:
+        The get_installed_nodes entry, or None if nothing matches
+    """
+    installed = get_installed_nodes()
+    query = node_id.lower()
+    info = installed.get(query)
+    if info is None:
+        info = next((info for name, info in installed.items() if query in name), None)
+    return info
+
+
 def search_custom_nodes(query: str = None, status: str = "all", category: str = None, limit: int = 10) -> dict:
     """Search for custom nodes in the ComfyUI Registry.
 
@@ -1692,8 +2464,10 @@ def search_custom_nodes(query: str = None, status: str = "all", category: str =
     # If filtering for installed only, just return local info
     if status == "installed":
         results = []
+        # installed_map keys are already lowercase
+        query_lower = query.lower() if query else None
         for node_name, info in installed_map.items():
-            if query and query.lower() not in node_name.lower():
+            if query_lower and query_lower not in node_name:
                 continue
             results.append({
                 "id": node_name,
@@ -1713,53 +2487,71 @@ def search_custom_nodes(query: str = None, status: str = "all", category: str =
             "nodes": results
         }
 
-    # Query the registry API
-    params = {"limit": min(limit * 2, 50)}  # Fetch extra in case we need to filter
+    # Query the registry API. Only the not-installed filter drops results, so
+    # only then fetch extra and page further until the limit is filled.
+    filtering = status == "not-installed"
+    page_size = min(limit * 2 if filtering else limit, 50)
+    params = {"limit": page_size}
     if query:
         params["search"] = query
 
-    result = query_registry("/nodes/search", params)
-    if "error" in result:
-        return result
-
-    nodes = result.get("nodes", [])
     results = []
+    is_installed_name = installed_map.__contains__
+    page = 1
 
-    for node in nodes:
-        node_id = node.get("id", "")
-        name = node.get("name", node_id)
-        repo = node.get("repository", "")
-        description = node.get("description", "")
-        author = node.get("publisher", {}).get("name", "") if isinstance(node.get("publisher"), dict) else ""
-        stars = node.get("github_stars", 0)
-        downloads = node.get("downloads", 0)
-
-        # Check if installed (match by id or repo folder name)
-        is_installed = False
-        repo_name = repo.rstrip("/").split("/")[-1] if repo else ""
-        if node_id.lower() in installed_map or repo_name.lower() in installed_map:
-            is_installed = True
-
-        # Status filter
-        if status == "not-installed" and is_installed:
-            continue
+    while True:
+        if page > 1:
+            params["page"] = page
+        result = query_registry("/nodes/search", params)
+        if "error" in result:
+            if results:
+                break  # Keep what earlier pages found
+            return result
+        if page == 1:
+            total = result.get("total")
+
+        nodes = result.get("nodes", [])
+        for node in nodes:
+            node_id = node["id"]
+            repo = node["repository"]
+            description = node["description"]
+
+            # Check if installed (match by id, then by repo folder name)
+            is_installed = is_installed_name(node_id.lower())
+            if not is_installed and repo:
+                is_installed = is_installed_name(repo.rstrip("/").rpartition("/")[2].lower())
+
+            # Status filter
+            if filtering and is_installed:
+                continue
 
-        results.append({
-            "id": node_id,
-            "name": name,
-            "author": author,
-            "description": description[:150] + "..." if len(description) > 150 else description,
-            "repository": repo,
-            "installed": is_installed,
-            "stars": stars,
-            "downloads": downloads
-        })
+            short_description = description[:150]
+            if len(description) > 150:
+                short_description += "..."
+
+            results.append({
+                "id": node_id,
+                "name": node["name"],
+                "author": node["author"],
+                "description": short_description,
+                "repository": repo,
+                "installed": is_installed,
+                "stars": node["stars"],
+                "downloads": node["downloads"]
+            })
 
-        if len(results) >= limit:
+            if len(results) >= limit:
+                break
+
+        # Stop once full, on the last page, or after SEARCH_MAX_PAGES requests
+        total_pages = result.get("totalPages") or page
+        if (not filtering or len(results) >= limit or len(nodes) < page_size
+                or page >= total_pages or page >= SEARCH_MAX_PAGES):
             break
+        page += 1
 
     return {
-        "total_matches": result.get("total", len(results)),
+        "total_matches": total if total is not None else len(results),
         "limit": limit,
         "query": query,
         "status_filter": status,
@@ -1767,35 +2559,44 @@ def search_custom_nodes(query: str = None, status: str = "all", category: str =
     }
 
 
-def install_custom_node(node_id: str) -> dict:
+def install_custom_node(node_id: str, install_requirements: bool = True) -> dict:
     """Install a custom node by cloning from git.
 
     Args:
         node_id: The node ID, name, or git URL to install
+        install_requirements: Start installing the node's requirements.txt with
+                              ComfyUI's pip in the background, without waiting
+                              for it (see check_install_status)
 
     Returns:
         Installation status.
     """
     import subprocess
-    import shutil
     import os
 
+    is_url = node_id.startswith("http://") or node_id.startswith("https://")
+
+    # Start the registry lookup now; the local checks below overlap with it
+    lookup = None if is_url else _get_executor().submit(query_registry, f"/nodes/{node_id}")
+
     custom_nodes_dir = get_comfyui_custom_nodes_dir()
     if not custom_nodes_dir:
         return {"error": "Could not find ComfyUI custom_nodes directory"}
 
     # Check if git is available
-    git = shutil.which("git")
+    git = _resolve_bin("git")
     if not git:
         return {"error": "git is not installed. Please install git to use this feature."}
 
+    installed_map = get_installed_nodes()
+
     # Determine the git URL
-    if node_id.startswith("http://") or node_id.startswith("https://"):
+    if is_url:
         git_url = node_id
         repo_name = git_url.rstrip("/").split("/")[-1].replace(".git", "")
     else:
         # Look up in the registry - first try direct lookup
-        result = query_registry(f"/nodes/{node_id}")
+        result = lookup.result()
         if "error" in result or not result.get("repository"):
             # Try search
             search_result = query_registry("/nodes/search", {"search": node_id, "limit": 5})
@@ -1823,9 +2624,13 @@ def install_custom_node(node_id: str) -> dict:
 
         repo_name = git_url.rstrip("/").split("/")[-1].replace(".git", "")
 
-    # Check if already installed
+    # Check if already installed (folder names are matched case-insensitively,
+    # as in search_custom_nodes)
     dest_path = os.path.join(custom_nodes_dir, repo_name)
-    if os.path.exists(dest_path):
+    existing = installed_map.get(repo_name.lower())
+    if existing:
+        dest_path = existing["path"]
+    if existing or os.path.exists(dest_path):
         return {
             "status": "already_installed",
             "path": dest_path,
@@ -1835,68 +2640,206 @@ def install_custom_node(node_id: str) -> dict:
     # Clone the repository
     try:
         subprocess.run(
-            [git, "clone", "--depth", "1", git_url, dest_path],
+            [git, "clone", "--depth", "1", "--single-branch", "--no-tags", git_url, dest_path],
             capture_output=True,
             text=True,
             check=True,
-            timeout=300
+            timeout=300,
+            env=_git_env()
         )
     except subprocess.CalledProcessError as e:
         return {"error": f"git clone failed: {e.stderr}"}
     except subprocess.TimeoutExpired:
         return {"error": "git clone timed out after 5 minutes"}
+    finally:
+        # A clone, even a failed one, can leave a new directory behind
+        invalidate_installed_nodes()
 
     # Check for requirements.txt and install dependencies
     requirements_file = os.path.join(dest_path, "requirements.txt")
     pip_message = ""
-    if os.path.exists(requirements_file):
-        pip_message = " Note: This node has a requirements.txt - dependencies may need to be installed."
-
-    return {
+    response = {
         "status": "installed",
         "node_id": node_id,
         "repository": git_url,
         "path": dest_path,
-        "message": f"Installed to {dest_path}. Restart ComfyUI to load the node.{pip_message}"
     }
+    lfs_note = _pull_lfs_files(git, dest_path)
+    if lfs_note:
+        response["lfs_note"] = lfs_note
+    if os.path.exists(requirements_file):
+        # Only install when ComfyUI's own interpreter is known; anything else
+        # could put the packages in the wrong environment
+        python = _comfyui_python() if install_requirements else None
+        if python:
+            started = _start_pip_install(repo_name, requirements_file, python)
+            if "error" in started:
+                pip_message = f" Could not install requirements.txt: {started['error']}"
+            else:
+                response["pip_pid"] = started["pid"]
+                pip_message = (" Installing requirements.txt in the background;"
+                               " use check_install_status before restarting.")
+        else:
+            pip_message = " Note: This node has a requirements.txt - dependencies may need to be installed."
+            if install_requirements:
+                pip_message += " (Could not find the Python environment ComfyUI runs in.)"
 
+    response["message"] = f"Installed to {dest_path}. Restart ComfyUI to load the node.{pip_message}"
+    return response
 
-def uninstall_custom_node(node_id: str) -> dict:
-    """Uninstall a custom node by removing its directory.
 
-    Args:
-        node_id: The node ID or folder name to uninstall
+# Background pip installs started by install_custom_node, keyed by lowercased
+# folder name: {"process", "log_path", "requirements", "python"}, plus "output"
+# once the finished install's log has been read (and deleted)
+_pip_installs = {}
+PIP_LOG_TAIL_LINES = 20
+
+
+def _comfyui_python():
+    """Find the Python interpreter ComfyUI runs with.
+
+    Checks for the portable build's embedded Python and for venvs next to the
+    ComfyUI folder.
 
     Returns:
-        Uninstallation status.
+        Path to the interpreter, or None if it can't be identified. The
+        interpreter running this server is not a safe guess: ComfyUI may run
+        from a system or conda Python of its own.
     """
-    import shutil
     import os
 
     custom_nodes_dir = get_comfyui_custom_nodes_dir()
-    if not custom_nodes_dir:
-        return {"error": "Could not find ComfyUI custom_nodes directory"}
+    if custom_nodes_dir:
+        comfy_root = os.path.dirname(custom_nodes_dir)
+        for base in (comfy_root, os.path.dirname(comfy_root)):
+            for candidate in (
+                os.path.join(base, "python_embeded", "python.exe"),
+                os.path.join(base, "venv", "bin", "python"),
+                os.path.join(base, ".venv", "bin", "python"),
+                os.path.join(base, "venv", "Scripts", "python.exe"),
+                os.path.join(base, ".venv", "Scripts", "python.exe"),
+            ):
+                if os.path.isfile(candidate):
+                    return candidate
+    return None
 
-    # Find the installed node
-    installed = get_installed_nodes()
 
-    target_path = None
-    target_name = None
+def _start_pip_install(folder_name: str, requirements_file: str, python: str) -> dict:
+    """Start `pip install -r requirements_file` without waiting for it.
 
-    # Try exact match first
-    if node_id.lower() in installed:
-        target_path = installed[node_id.lower()]["path"]
-        target_name = installed[node_id.lower()]["name"]
-    else:
-        # Try partial match
-        for name, info in installed.items():
-            if node_id.lower() in name:
-                target_path = info["path"]
-                target_name = info["name"]
-                break
+    Output goes to a log file rather than a pipe, which could fill up and
+    block pip since nothing reads it while the install runs.
+
+    Returns:
+        {"pid": process id} or {"error": message}
+    """
+    import subprocess
+    import tempfile
+
+    try:
+        with tempfile.NamedTemporaryFile(prefix="comfy-pilot-pip-", suffix=".log", delete=False) as log:
+            process = subprocess.Popen(
+                [python, "-m", "pip", "install", "-r", requirements_file],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+    except OSError as e:
+        return {"error": str(e)}
+
+    _pip_installs[folder_name.lower()] = {
+        "process": process,
+        "log_path": log.name,
+        "requirements": requirements_file,
+        "python": python,
+    }
+    return {"pid": process.pid}
+
+
+def check_install_status(node_id: str) -> dict:
+    """Check on the background requirements install of a custom node.
+
+    Args:
+        node_id: The node ID or folder name passed to install_custom_node
+
+    Returns:
+        Status of the pip install ("running", "done" or "failed") with the
+        end of its output once it has finished.
+    """
+    import os
+
+    query = node_id.rstrip("/").rpartition("/")[2].replace(".git", "").lower()
+    entry = _pip_installs.get(query)
+    if entry is None:
+        info = _find_installed_node(node_id)
+        if info:
+            entry = _pip_installs.get(info["name"].lower())
+    if entry is None:
+        return {"error": f"No background install was started for '{node_id}' in this session"}
+
+    process = entry["process"]
+    returncode = process.poll()
+    result = {
+        "node_id": node_id,
+        "pid": process.pid,
+        "requirements": entry["requirements"],
+        "python": entry["python"],
+    }
+    if returncode is None:
+        result["status"] = "running"
+        return result
+
+    result["status"] = "done" if returncode == 0 else "failed"
+    result["returncode"] = returncode
+    if "output" not in entry:
+        # The log is complete now; keep its tail and delete the temp file
+        try:
+            with open(entry["log_path"], encoding="utf-8", errors="replace") as f:
+                tail = collections.deque(f, maxlen=PIP_LOG_TAIL_LINES)
+            entry["output"] = "".join(tail)
+            os.remove(entry["log_path"])
+        except OSError:
+            entry.setdefault("output", None)
+    if entry["output"] is not None:
+        result["output"] = entry["output"]
+    return result
+
+
+def _retry_writable(func, path, exc):
+    """shutil.rmtree error handler that clears the read-only flag and retries.
+
+    Git marks pack files read-only, which makes deletion fail on Windows.
+    """
+    import os
+    import stat
+
+    os.chmod(path, stat.S_IWRITE | stat.S_IREAD | stat.S_IEXEC)
+    func(path)
+
+
+def uninstall_custom_node(node_id: str) -> dict:
+    """Uninstall a custom node by removing its directory.
+
+    Args:
+        node_id: The node ID or folder name to uninstall
+
+    Returns:
+        Uninstallation status.
+    """
+    import shutil
+    import os
+
+    custom_nodes_dir = get_comfyui_custom_nodes_dir()
+    if not custom_nodes_dir:
+        return {"error": "Could not find ComfyUI custom_nodes directory"}
 
-    if not target_path:
+    # Find the installed node
+    info = _find_installed_node(node_id)
+    if not info:
         return {"error": f"Node '{node_id}' is not installed. Use search_custom_nodes(status='installed') to see installed nodes."}
+    target_path = info["path"]
+    target_name = info["name"]
 
     # Confirm the path is inside custom_nodes (safety check)
     if not os.path.abspath(target_path).startswith(os.path.abspath(custom_nodes_dir)):
@@ -1904,9 +2847,14 @@ def uninstall_custom_node(node_id: str) -> dict:
 
     # Remove the directory
     try:
-        shutil.rmtree(target_path)
+        if sys.version_info >= (3, 12):
+            shutil.rmtree(target_path, onexc=_retry_writable)
+        else:
+            shutil.rmtree(target_path, onerror=_retry_writable)
     except Exception as e:
         return {"error": f"Failed to remove directory: {str(e)}"}
+    finally:
+        invalidate_installed_nodes()
 
     return {
         "status": "uninstalled",
@@ -1926,7 +2874,6 @@ def update_custom_node(node_id: str) -> dict:
         Update status.
     """
     import subprocess
-    import shutil
     import os
 
     custom_nodes_dir = get_comfyui_custom_nodes_dir()
@@ -1934,36 +2881,18 @@ def update_custom_node(node_id: str) -> dict:
         return {"error": "Could not find ComfyUI custom_nodes directory"}
 
     # Check if git is available
-    git = shutil.which("git")
+    git = _resolve_bin("git")
     if not git:
         return {"error": "git is not installed. Please install git to use this feature."}
 
     # Find the installed node
-    installed = get_installed_nodes()
-
-    target_path = None
-    target_name = None
-    is_git = False
-
-    # Try exact match first
-    if node_id.lower() in installed:
-        info = installed[node_id.lower()]
-        target_path = info["path"]
-        target_name = info["name"]
-        is_git = info["is_git"]
-    else:
-        # Try partial match
-        for name, info in installed.items():
-            if node_id.lower() in name:
-                target_path = info["path"]
-                target_name = info["name"]
-                is_git = info["is_git"]
-                break
-
-    if not target_path:
+    info = _find_installed_node(node_id)
+    if not info:
         return {"error": f"Node '{node_id}' is not installed. Install it first with install_custom_node."}
+    target_path = info["path"]
+    target_name = info["name"]
 
-    if not is_git:
+    if not info["is_git"]:
         return {"error": f"'{target_name}' is not a git repository and cannot be updated this way."}
 
     # Run git pull
@@ -1973,7 +2902,8 @@ def update_custom_node(node_id: str) -> dict:
             cwd=target_path,
             capture_output=True,
             text=True,
-            timeout=120
+            timeout=120,
+            env=_git_env()
         )
 
         if result.returncode != 0:
@@ -1987,12 +2917,16 @@ def update_custom_node(node_id: str) -> dict:
                 "message": f"'{target_name}' is already up to date."
             }
 
-        return {
+        response = {
             "status": "updated",
             "node_id": target_name,
             "path": target_path,
             "message": f"Updated '{target_name}'. Restart ComfyUI to load changes."
         }
+        lfs_note = _pull_lfs_files(git, target_path)
+        if lfs_note:
+            response["lfs_note"] = lfs_note
+        return response
 
     except subprocess.TimeoutExpired:
         return {"error": "git pull timed out after 2 minutes"}
@@ -2031,20 +2965,23 @@ MODEL_TYPE_FOLDERS = {
     "animatediff": "animatediff_models",
 }
 
+# Accepted model_type values, listed in the unknown-type error
+VALID_MODEL_TYPES = sorted(MODEL_TYPE_FOLDERS)
+
 
 def get_comfyui_models_dir() -> str:
-    """Get the ComfyUI models directory."""
-    import os
+    """Get the ComfyUI models directory (looked up until found, then cached)."""
+    path = _comfyui_dirs.get("models")
+    if path is None:
+        path = _find_models_dir()
+        if path:
+            _comfyui_dirs["models"] = path
+    return path
 
-    # Try to get from ComfyUI's folder_paths if available
-    try:
-        # Query ComfyUI for its base path
-        result = make_request("/system_stats")
-        if "error" not in result:
-            # ComfyUI is running, try to find models folder
-            pass
-    except Exception:
-        pass
+
+def _find_models_dir() -> str:
+    """Search for the ComfyUI models directory."""
+    import os
 
     # Common locations
     possible_paths = [
@@ -2067,6 +3004,14 @@ def get_comfyui_models_dir() -> str:
     return None
 
 
+# Full Hugging Face URL: user, repo and optionally branch and file path
+_HF_URL_RE = re.compile(r"https?://huggingface\.co/([^/]+)/([^/]+)(?:/(?:blob|resolve)/([^/]+)/(.+))?")
+
+# CivitAI download API URL (model version ID) and model page URL (model ID)
+_CIVITAI_API_RE = re.compile(r"https?://civitai\.com/api/download/models/(\d+)")
+_CIVITAI_MODEL_RE = re.compile(r"https?://civitai\.com/models/(\d+)")
+
+
 def parse_hf_url(url: str) -> dict:
     """Parse a Hugging Face URL to extract repo and file info.
 
@@ -2076,22 +3021,21 @@ def parse_hf_url(url: str) -> dict:
     - user/repo (assumes root of repo)
     - user/repo/file.safetensors
     """
-    import re
-
     # Full URL format
-    hf_pattern = r"https?://huggingface\.co/([^/]+)/([^/]+)(?:/(?:blob|resolve)/([^/]+)/(.+))?"
-    match = re.match(hf_pattern, url)
-    if match:
-        user, repo, branch, filepath = match.groups()
-        return {
-            "type": "huggingface",
-            "repo": f"{user}/{repo}",
-            "branch": branch or "main",
-            "filepath": filepath,
-        }
+    if url.startswith("http"):
+        match = _HF_URL_RE.match(url)
+        if match:
+            user, repo, branch, filepath = match.groups()
+            return {
+                "type": "huggingface",
+                "repo": f"{user}/{repo}",
+                "branch": branch or "main",
+                "filepath": filepath,
+            }
+        return None
 
     # Short format: user/repo or user/repo/file.safetensors
-    if "/" in url and not url.startswith("http"):
+    if "/" in url:
         parts = url.split("/")
         if len(parts) >= 2:
             repo = f"{parts[0]}/{parts[1]}"
@@ -2114,11 +3058,8 @@ def parse_civitai_url(url: str) -> dict:
     - https://civitai.com/models/123456/model-name
     - https://civitai.com/api/download/models/789
     """
-    import re
-
     # API download URL
-    api_pattern = r"https?://civitai\.com/api/download/models/(\d+)"
-    match = re.match(api_pattern, url)
+    match = _CIVITAI_API_RE.match(url)
     if match:
         return {
             "type": "civitai",
@@ -2127,8 +3068,7 @@ def parse_civitai_url(url: str) -> dict:
         }
 
     # Model page URL
-    model_pattern = r"https?://civitai\.com/models/(\d+)"
-    match = re.match(model_pattern, url)
+    match = _CIVITAI_MODEL_RE.match(url)
     if match:
         return {
             "type": "civitai",
@@ -2138,7 +3078,8 @@ def parse_civitai_url(url: str) -> dict:
     return None
 
 
-def download_model(url: str, model_type: str, filename: str = None, hf_token: str = None, subfolder: str = None) -> dict:
+def download_model(url: str, model_type: str, filename: str = None, hf_token: str = None, subfolder: str = None,
+                   parallel: bool = True) -> dict:
     """Download a model to the appropriate ComfyUI folder.
 
     Args:
@@ -2148,21 +3089,22 @@ def download_model(url: str, model_type: str, filename: str = None, hf_token: st
         filename: Optional filename override. Auto-detected from URL if not provided.
         hf_token: Hugging Face token for gated models. Only needed if download fails with auth error.
         subfolder: Optional subfolder within the model type directory
+        parallel: Use parallel transfers (hf_transfer for Hugging Face, byte
+                  ranges for direct URLs) where available. Best-effort for
+                  in-process Hugging Face downloads, which use hf_transfer
+                  whenever it is installed
 
     Returns:
         Download status with file path, or error with instructions for gated models.
     """
-    import subprocess
     import os
-    import shutil
-    import re
 
     # Validate model_type
     folder_name = MODEL_TYPE_FOLDERS.get(model_type.lower())
     if not folder_name:
         return {
             "error": f"Unknown model_type: {model_type}",
-            "valid_types": list(set(MODEL_TYPE_FOLDERS.values()))
+            "valid_types": VALID_MODEL_TYPES
         }
 
     # Get ComfyUI models directory
@@ -2178,53 +3120,275 @@ def download_model(url: str, model_type: str, filename: str = None, hf_token: st
     # Create directory if needed
     os.makedirs(dest_dir, exist_ok=True)
 
-    # Parse URL to determine download method
+    # Pick the download method by host; only that host's parser runs
+    if url.startswith(("http://", "https://")):
+        host = urllib.parse.urlsplit(url).hostname or ""
+        if host == "huggingface.co":
+            hf_info = parse_hf_url(url)
+            if hf_info:
+                return _download_from_huggingface(hf_info, dest_dir, filename, hf_token, parallel)
+        elif host == "civitai.com":
+            civitai_info = parse_civitai_url(url)
+            if civitai_info:
+                return _download_from_civitai(civitai_info, dest_dir, filename, parallel)
+        return _download_direct(url, dest_dir, filename, parallel=parallel)
+
+    # Assume it's a HF repo shorthand
     hf_info = parse_hf_url(url)
-    civitai_info = parse_civitai_url(url)
-
     if hf_info:
-        return _download_from_huggingface(hf_info, dest_dir, filename, hf_token)
-    elif civitai_info:
-        return _download_from_civitai(civitai_info, dest_dir, filename)
-    elif url.startswith("http://") or url.startswith("https://"):
-        return _download_direct(url, dest_dir, filename)
-    else:
-        # Assume it's a HF repo shorthand
-        hf_info = parse_hf_url(url)
-        if hf_info:
-            return _download_from_huggingface(hf_info, dest_dir, filename, hf_token)
-        return {"error": f"Could not parse URL: {url}"}
+        return _download_from_huggingface(hf_info, dest_dir, filename, hf_token, parallel)
+    return {"error": f"Could not parse URL: {url}"}
+
+
+# Batch downloads: at most MODEL_DOWNLOAD_WORKERS files at once, and at most
+# MODEL_DOWNLOADS_PER_HOST from any one host so CDNs don't start rate limiting
+MODEL_DOWNLOAD_WORKERS = 4
+MODEL_DOWNLOADS_PER_HOST = 2
+_host_download_slots = {}
+# Connections open for parallel range requests, per host (see _download_ranged)
+_host_range_slots = {}
+_host_slots_lock = threading.Lock()
 
 
-def _download_from_huggingface(hf_info: dict, dest_dir: str, filename: str = None, hf_token: str = None) -> dict:
-    """Download a model from Hugging Face."""
+def _host_semaphore(slots: dict, host: str, limit: int) -> threading.BoundedSemaphore:
+    """Get host's semaphore from slots, creating it with limit permits."""
+    with _host_slots_lock:
+        slot = slots.get(host)
+        if slot is None:
+            slot = slots[host] = threading.BoundedSemaphore(limit)
+    return slot
+
+
+def _host_download_slot(url: str) -> threading.BoundedSemaphore:
+    """Get the semaphore limiting concurrent downloads from url's host."""
+    # Anything without a scheme is Hugging Face repo shorthand
+    host = urllib.parse.urlsplit(url).hostname or "huggingface.co"
+    return _host_semaphore(_host_download_slots, host, MODEL_DOWNLOADS_PER_HOST)
+
+
+def _download_job_destination(job: dict) -> tuple:
+    """Key identifying where a download_models job will write its file."""
+    import posixpath
+
+    folder = MODEL_TYPE_FOLDERS.get(str(job["model_type"]).lower(), job["model_type"])
+    name = job.get("filename") or posixpath.basename(urllib.parse.urlsplit(job["url"]).path) or job["url"]
+    return folder, job.get("subfolder") or "", name
+
+
+def download_models(downloads: list, parallel: bool = True) -> dict:
+    """Download several models concurrently.
+
+    Args:
+        downloads: List of dicts with the download_model arguments
+                   (url, model_type, and optionally filename, hf_token, subfolder)
+        parallel: Default for each download's parallel option
+
+    Returns:
+        Per-download results in request order, with success/failure counts.
+        Entries that write to the same file as an earlier one are downloaded
+        once and marked with "duplicate_of": that entry's index.
+    """
+    if not isinstance(downloads, list) or not downloads:
+        return {"error": "downloads must be a non-empty list of {url, model_type} objects"}
+
+    def run_one(job):
+        if not isinstance(job, dict) or not job.get("url") or not job.get("model_type"):
+            return {"error": "Each download needs url and model_type"}
+        try:
+            with _host_download_slot(job["url"]):
+                return download_model(
+                    url=job["url"],
+                    model_type=job["model_type"],
+                    filename=job.get("filename"),
+                    hf_token=job.get("hf_token"),
+                    subfolder=job.get("subfolder"),
+                    parallel=job.get("parallel", parallel)
+                )
+        except Exception as e:
+            return {"error": f"Download failed: {type(e).__name__}: {e}"}
+        finally:
+            # The pool's threads end with this call; don't leave their sockets open
+            close_thread_http_connections()
+
+    # Jobs writing to the same destination would race on one file; download
+    # it once and report the same result for each duplicate
+    first_for_destination = {}
+    duplicate_of = {}
+    unique_jobs = []
+    for i, job in enumerate(downloads):
+        if isinstance(job, dict) and job.get("url") and job.get("model_type"):
+            key = _download_job_destination(job)
+            if key in first_for_destination:
+                duplicate_of[i] = first_for_destination[key]
+                continue
+            first_for_destination[key] = i
+        unique_jobs.append(i)
+
+    workers = min(MODEL_DOWNLOAD_WORKERS, len(unique_jobs))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                               thread_name_prefix="comfy-pilot-download") as pool:
+        unique_results = pool.map(run_one, [downloads[i] for i in unique_jobs])
+        results_by_index = dict(zip(unique_jobs, unique_results))
+
+    results = []
+    for i in range(len(downloads)):
+        if i in duplicate_of:
+            results.append({**results_by_index[duplicate_of[i]], "duplicate_of": duplicate_of[i]})
+        else:
+            results.append(results_by_index[i])
+
+    failed = sum(1 for result in results if "error" in result)
+    return {
+        "results": results,
+        "succeeded": len(results) - failed,
+        "failed": failed
+    }
+
+
+def _hf_gated_response(repo: str) -> dict:
+    """Error result asking for a Hugging Face token."""
+    return {
+        "error": "gated_model",
+        "repo": repo,
+        "message": "This model requires authentication. Please provide your Hugging Face token.",
+        "instructions": "Get your token from https://huggingface.co/settings/tokens (read access is sufficient). Then call this tool again with hf_token parameter.",
+        "accept_url": f"https://huggingface.co/{repo}"
+    }
+
+
+def _hf_requires_token(repo: str, filepath: str = None, revision: str = "main") -> bool:
+    """Check with one HEAD request whether a Hugging Face file needs a token.
+
+    Returns:
+        True on 401/403. False if the file is accessible, or if the probe
+        itself failed (the download then reports the real error).
+    """
+    # Whole-repo downloads probe .gitattributes, which nearly every repo has
+    path = urllib.parse.quote(filepath or ".gitattributes")
+    url = f"https://huggingface.co/{repo}/resolve/{urllib.parse.quote(revision, safe='')}/{path}"
+    try:
+        # Accessible files redirect to the CDN; no need to follow
+        with http_open("HEAD", url, headers={"User-Agent": DOWNLOAD_USER_AGENT}, timeout=10) as response:
+            response.read()
+            return response.status in (401, 403)
+    except (OSError, http.client.HTTPException):
+        return False
+
+
+# Added to Hugging Face results when a parallel download wasn't possible
+HF_TRANSFER_NOTE = "Downloaded over a single connection; pip install hf_transfer for faster parallel downloads."
+
+
+def _hf_transfer_available() -> bool:
+    """Whether the hf_transfer multi-connection downloader is installed."""
+    import importlib.util
+
+    return importlib.util.find_spec("hf_transfer") is not None
+
+
+# Whether in-process Hugging Face downloads use hf_transfer. huggingface_hub
+# reads this from a process-wide setting, so it is decided once rather than
+# per download (concurrent downloads would overwrite each other's choice)
+HF_TRANSFER_ENABLED = _hf_transfer_available()
+HF_ETAG_TIMEOUT = 15  # Seconds to wait for file metadata before giving up
+
+
+def _download_hf_in_process(hf_info: dict, dest_dir: str, hf_token: str = None, parallel: bool = True) -> dict:
+    """Download from Hugging Face with the huggingface_hub library, if installed.
+
+    Avoids starting a huggingface-cli process per download and reuses the
+    library's HTTP session across downloads.
+
+    parallel is best-effort here: hf_transfer is a process-wide setting, used
+    for every in-process download when installed (see HF_TRANSFER_ENABLED).
+    parallel=False only takes effect on the huggingface-cli fallback.
+
+    Unlike the CLI's 10 minute limit there is no overall time limit, so large
+    files can finish on slow links. A stalled transfer still fails: metadata
+    requests time out after HF_ETAG_TIMEOUT seconds, and file reads after
+    huggingface_hub's HF_HUB_DOWNLOAD_TIMEOUT seconds without data.
+
+    Returns:
+        Download result, or None if huggingface_hub can't be imported
+    """
+    import os
+
+    # Read by huggingface_hub on import; the same value on every call, and an
+    # explicit setting in the environment wins
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1" if HF_TRANSFER_ENABLED else "0")
+    try:
+        import huggingface_hub
+        from huggingface_hub.utils import GatedRepoError, HfHubHTTPError
+    except ImportError:
+        return None
+    use_hf_transfer = huggingface_hub.constants.HF_HUB_ENABLE_HF_TRANSFER
+
+    repo = hf_info["repo"]
+    filepath = hf_info.get("filepath")
+    revision = hf_info.get("branch") or "main"
+
+    try:
+        if filepath:
+            downloaded_file = huggingface_hub.hf_hub_download(
+                repo_id=repo, filename=filepath, revision=revision,
+                local_dir=dest_dir, token=hf_token or None, etag_timeout=HF_ETAG_TIMEOUT
+            )
+        else:
+            downloaded_file = huggingface_hub.snapshot_download(
+                repo_id=repo, revision=revision,
+                local_dir=dest_dir, token=hf_token or None, etag_timeout=HF_ETAG_TIMEOUT
+            )
+    except GatedRepoError:
+        return _hf_gated_response(repo)
+    except HfHubHTTPError as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if status in (401, 403):
+            return _hf_gated_response(repo)
+        return {"error": "download_failed", "message": str(e)}
+    except Exception as e:
+        return {"error": f"Download failed: {str(e)}"}
+
+    result = {
+        "status": "success",
+        "repo": repo,
+        "filepath": filepath,
+        "destination": downloaded_file,
+        "message": f"Downloaded to {downloaded_file}"
+    }
+    if parallel and not use_hf_transfer:
+        result["note"] = HF_TRANSFER_NOTE
+    return result
+
+
+def _download_from_huggingface(hf_info: dict, dest_dir: str, filename: str = None, hf_token: str = None,
+                               parallel: bool = True) -> dict:
+    """Download a model from Hugging Face.
+
+    Uses huggingface_hub in-process when it is importable, otherwise runs
+    huggingface-cli.
+    """
     import subprocess
-    import shutil
     import os
 
+    result = _download_hf_in_process(hf_info, dest_dir, hf_token, parallel)
+    if result is not None:
+        return result
+
     repo = hf_info["repo"]
     filepath = hf_info.get("filepath")
 
     # Check if huggingface-cli is available
-    hf_cli = shutil.which("huggingface-cli")
-    if not hf_cli:
-        # Try common locations
-        common_paths = [
-            os.path.expanduser("~/.local/bin/huggingface-cli"),
-            "/usr/local/bin/huggingface-cli",
-            "/opt/homebrew/bin/huggingface-cli",
-        ]
-        for path in common_paths:
-            if os.path.isfile(path) and os.access(path, os.X_OK):
-                hf_cli = path
-                break
-
+    hf_cli = _resolve_bin("huggingface-cli")
     if not hf_cli:
         return {
             "error": "huggingface-cli not found",
             "instructions": "Install with: pip install huggingface_hub[cli]"
         }
 
+    # Catch gated models with a HEAD request rather than a failed CLI run
+    if not hf_token and _hf_requires_token(repo, filepath, hf_info.get("branch") or "main"):
+        return _hf_gated_response(repo)
+
     # Build command
     cmd = [hf_cli, "download", repo]
 
@@ -2237,13 +3401,18 @@ def _download_from_huggingface(hf_info: dict, dest_dir: str, filename: str = Non
     if hf_token:
         cmd.extend(["--token", hf_token])
 
+    # huggingface-cli checks for hf_transfer itself, in its own environment
+    env = dict(os.environ)
+    env["HF_HUB_ENABLE_HF_TRANSFER"] = "1" if parallel and HF_TRANSFER_ENABLED else "0"
+
     # Run download
     try:
         result = subprocess.run(
             cmd,
             capture_output=True,
             text=True,
-            timeout=600  # 10 minute timeout
+            timeout=600,  # 10 minute timeout
+            env=env
         )
 
         if result.returncode == 0:
@@ -2264,13 +3433,7 @@ def _download_from_huggingface(hf_info: dict, dest_dir: str, filename: str = Non
             stderr = result.stderr.lower()
             # Check for auth errors
             if "401" in stderr or "403" in stderr or "gated" in stderr or "access" in stderr:
-                return {
-                    "error": "gated_model",
-                    "repo": repo,
-                    "message": "This model requires authentication. Please provide your Hugging Face token.",
-                    "instructions": "Get your token from https://huggingface.co/settings/tokens (read access is sufficient). Then call this tool again with hf_token parameter.",
-                    "accept_url": f"https://huggingface.co/{repo}"
-                }
+                return _hf_gated_response(repo)
             return {
                 "error": "download_failed",
                 "message": result.stderr or result.stdout or "Unknown error"
@@ -2282,7 +3445,7 @@ def _download_from_huggingface(hf_info: dict, dest_dir: str, filename: str = Non
         return {"error": f"Download failed: {str(e)}"}
 
 
-def _download_from_civitai(civitai_info: dict, dest_dir: str, filename: str = None) -> dict:
+def _download_from_civitai(civitai_info: dict, dest_dir: str, filename: str = None, parallel: bool = True) -> dict:
     """Download a model from CivitAI."""
     import subprocess
     import os
@@ -2303,56 +3466,108 @@ def _download_from_civitai(civitai_info: dict, dest_dir: str, filename: str = No
     else:
         return {"error": "Could not parse CivitAI URL"}
 
-    return _download_direct(download_url, dest_dir, filename, source="civitai")
+    return _download_direct(download_url, dest_dir, filename, source="civitai", parallel=parallel)
+
+
+# Per-destination locks: concurrent downloads of the same file would both pass
+# the exists check and write into the same .part file
+_destination_locks = {}
+_destination_locks_lock = threading.Lock()
 
 
-def _download_direct(url: str, dest_dir: str, filename: str = None, source: str = "direct") -> dict:
+def _destination_lock(dest_path: str) -> threading.Lock:
+    """Get the lock serializing downloads to dest_path."""
+    import os
+
+    key = os.path.normcase(os.path.abspath(dest_path))
+    with _destination_locks_lock:
+        lock = _destination_locks.get(key)
+        if lock is None:
+            lock = _destination_locks[key] = threading.Lock()
+    return lock
+
+
+def _download_direct(url: str, dest_dir: str, filename: str = None, source: str = "direct",
+                     parallel: bool = True) -> dict:
     """Download a file directly via wget or curl."""
-    import subprocess
-    import shutil
     import os
-    import re
+    import posixpath
 
     # Determine filename
     if not filename:
-        # Try to extract from URL
-        url_path = url.split("?")[0]  # Remove query params
-        filename = os.path.basename(url_path)
-        if not filename or "." not in filename:
+        # Try to extract from the URL path (urlsplit drops the query and fragment)
+        filename = posixpath.basename(urllib.parse.urlsplit(url).path)
+        if "." not in filename:
             filename = "downloaded_model.safetensors"
 
     dest_path = os.path.join(dest_dir, filename)
 
+    # A second download of the same file waits here, then finds it in place
+    with _destination_lock(dest_path):
+        return _download_to_path(url, dest_path, source, parallel)
+
+
+def _download_to_path(url: str, dest_path: str, source: str, parallel: bool) -> dict:
+    """Download url to dest_path; the caller holds dest_path's lock."""
+    import subprocess
+    import os
+
     # Check if already exists
-    if os.path.exists(dest_path):
+    if _try_stat(dest_path):
         return {
             "status": "exists",
             "destination": dest_path,
             "message": f"File already exists at {dest_path}"
         }
 
+    # Downloads land in a .part file that is renamed once complete, so an
+    # interrupted download is resumed by the next call instead of restarted
+    part_path = dest_path + PARTIAL_DOWNLOAD_SUFFIX
+    resuming = _try_stat(part_path) is not None
+
+    # A parallel download cut off by the server exiting; its missing ranges
+    # aren't tracked, so start over
+    if _try_stat(dest_path + RANGED_PARTIAL_SUFFIX):
+        os.remove(dest_path + RANGED_PARTIAL_SUFFIX)
+
+    # Large files from servers that accept byte ranges download in parallel
+    if parallel and not resuming and _download_ranged(url, dest_path):
+        file_size = os.path.getsize(dest_path)
+        return {
+            "status": "success",
+            "source": source,
+            "destination": dest_path,
+            "size_mb": round(file_size / (1024 * 1024), 2),
+            "message": f"Downloaded to {dest_path}"
+        }
+
     # Try wget first, then curl
-    wget = shutil.which("wget")
-    curl = shutil.which("curl")
+    wget = _resolve_bin("wget")
+    curl = _resolve_bin("curl")
 
     if wget:
-        cmd = [wget, "-O", dest_path, "--progress=bar:force", url]
+        cmd = [wget, "-nv", "-c", "-O", part_path, url]
     elif curl:
-        cmd = [curl, "-L", "-o", dest_path, "--progress-bar", url]
+        cmd = [curl, "-sS", "-L", "--fail", "-C", "-", "-o", part_path, url]
     else:
         # Fallback to Python urllib
         return _download_with_urllib(url, dest_path)
 
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=1800  # 30 minute timeout for large files
-        )
-
-        if result.returncode == 0 and os.path.exists(dest_path):
-            file_size = os.path.getsize(dest_path)
+        # Progress output is never shown over stdio, so run quietly and keep
+        # only the tail of stderr for the error message
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            _, err = proc.communicate(timeout=1800)  # 30 minute timeout for large files
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+
+        st = _try_stat(part_path)
+        if proc.returncode == 0 and st:
+            os.replace(part_path, dest_path)
+            file_size = st.st_size
             return {
                 "status": "success",
                 "source": source,
@@ -2361,37 +3576,174 @@ def _download_direct(url: str, dest_dir: str, filename: str = None, source: str
                 "message": f"Downloaded to {dest_path}"
             }
         else:
-            # Clean up partial file
-            if os.path.exists(dest_path):
-                os.remove(dest_path)
+            # The server answered with an error status, so there's nothing to
+            # resume; other failures (dropped connection) keep the partial file
+            http_error = proc.returncode == (8 if wget else 22)
+            if http_error and st:
+                os.remove(part_path)
             return {
                 "error": "download_failed",
-                "message": result.stderr or result.stdout or "Unknown error"
+                "message": err[-DOWNLOAD_STDERR_TAIL:].decode("utf-8", "replace") or "Unknown error",
+                "resumable": not http_error and st is not None
             }
 
     except subprocess.TimeoutExpired:
-        if os.path.exists(dest_path):
-            os.remove(dest_path)
-        return {"error": "Download timed out after 30 minutes"}
+        return {
+            "error": "Download timed out after 30 minutes",
+            "resumable": _try_stat(part_path) is not None,
+            "message": "Run the download again to resume from the partial file"
+        }
     except Exception as e:
         return {"error": f"Download failed: {str(e)}"}
 
 
-def _download_with_urllib(url: str, dest_path: str) -> dict:
-    """Fallback download using urllib."""
+# Parallel byte-range downloads: files of at least RANGED_DOWNLOAD_MIN_SIZE are
+# split into RANGED_DOWNLOAD_PARTS ranges fetched on separate connections, with
+# at most RANGED_DOWNLOAD_PARTS range connections open to one host at a time
+RANGED_DOWNLOAD_PARTS = 8
+RANGED_DOWNLOAD_MIN_SIZE = 64 << 20
+DOWNLOAD_USER_AGENT = "ComfyUI-Model-Downloader"
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # Read/write size when streaming downloads to disk
+DOWNLOAD_STDERR_TAIL = 2048  # Bytes of wget/curl stderr kept for failure messages
+PARTIAL_DOWNLOAD_SUFFIX = ".part"  # Incomplete single-stream downloads, resumed with a Range request
+# Incomplete parallel downloads. Preallocated to full size with holes, so they
+# can't be resumed like a .part file and are discarded instead
+RANGED_PARTIAL_SUFFIX = ".ranged" + PARTIAL_DOWNLOAD_SUFFIX
+
+
+def _download_ranged(url: str, dest_path: str) -> bool:
+    """Download a file as parallel HTTP Range requests into a preallocated file.
+
+    The ranges are written to a temporary file that is moved to dest_path only
+    once every range has finished, so an interrupted download never leaves a
+    full-size file with holes at dest_path.
+
+    Returns:
+        True if the file was downloaded. False if the server doesn't report a
+        size or accept ranges, the file is small, or any part failed; nothing
+        is left at dest_path and the caller should fall back to a single stream.
+    """
     import os
 
+    temp_path = dest_path + RANGED_PARTIAL_SUFFIX
+
+    # Resolve redirects (CivitAI and HF send files from a CDN) and read the size
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": "ComfyUI-Model-Downloader"})
-        with urllib.request.urlopen(req, timeout=1800) as response:
-            with open(dest_path, "wb") as f:
-                while True:
-                    chunk = response.read(8192)
+        with http_open("HEAD", url, headers={"User-Agent": DOWNLOAD_USER_AGENT}, timeout=30,
+                       follow_redirects=True) as response:
+            response.read()
+            final_url = response.url
+            total = int(response.getheader("Content-Length") or 0)
+            accepts_ranges = response.getheader("Accept-Ranges", "").lower() == "bytes"
+    except (OSError, ValueError, http.client.HTTPException):
+        return False
+    if response.status != 200 or not accepts_ranges or total < RANGED_DOWNLOAD_MIN_SIZE:
+        return False
+
+    part_size = -(-total // RANGED_DOWNLOAD_PARTS)
+    ranges = [(start, min(start + part_size, total) - 1) for start in range(0, total, part_size)]
+
+    failed = threading.Event()  # Lets the other parts stop early once one fails
+
+    # Range connections count against a per-host budget shared by every
+    # download, so concurrent downloads from one CDN split the parts between them
+    connection_slots = _host_semaphore(_host_range_slots, urllib.parse.urlsplit(final_url).hostname,
+                                       RANGED_DOWNLOAD_PARTS)
+
+    def fetch(byte_range):
+        try:
+            with connection_slots:
+                if failed.is_set():
+                    return
+                fetch_range(*byte_range)
+        except BaseException:
+            failed.set()
+            raise
+
+    def fetch_range(start, end):
+        # Plain urlopen: the part threads are short-lived, so pooled
+        # connections opened from them would never be reused
+        req = urllib.request.Request(final_url, headers={
+            "User-Agent": DOWNLOAD_USER_AGENT,
+            "Range": f"bytes={start}-{end}",
+        })
+        with urllib.request.urlopen(req, timeout=60) as response:
+            # A 200 means the server ignored the range and is sending everything
+            if response.status != 206:
+                raise OSError(f"range request answered with HTTP {response.status}")
+            with open(temp_path, "r+b") as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining:
+                    if failed.is_set():
+                        return
+                    chunk = response.read(min(remaining, DOWNLOAD_CHUNK_SIZE))
                     if not chunk:
-                        break
+                        raise OSError("connection closed before the range was complete")
                     f.write(chunk)
+                    remaining -= len(chunk)
 
-        file_size = os.path.getsize(dest_path)
+    try:
+        with open(temp_path, "wb") as f:
+            f.truncate(total)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            for future in [pool.submit(fetch, r) for r in ranges]:
+                future.result()
+        os.replace(temp_path, dest_path)
+        return True
+    except Exception:
+        if _try_stat(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+def _try_stat(path: str):
+    """Return os.stat(path), or None if the file doesn't exist."""
+    import os
+
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _download_with_urllib(url: str, dest_path: str) -> dict:
+    """Fallback download over a pooled HTTP connection, used without wget and curl.
+
+    Resumes from a leftover .part file with a Range request when one exists.
+    """
+    import os
+    import shutil
+
+    part_path = dest_path + PARTIAL_DOWNLOAD_SUFFIX
+    st = _try_stat(part_path)
+    offset = st.st_size if st else 0
+    headers = {"User-Agent": DOWNLOAD_USER_AGENT}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+
+    try:
+        # Pooled connection, so consecutive downloads from one host skip the TLS handshake
+        with http_open("GET", url, headers=headers, timeout=1800,
+                       follow_redirects=True) as response:
+            if response.status == 416 and offset:
+                # Nothing past the end of the partial file, so it's complete
+                response.read()
+            elif response.status >= 400:
+                response.read()
+                if st:
+                    os.remove(part_path)
+                return {"error": f"HTTP error: {response.status} {response.reason}"}
+            else:
+                # A 200 instead of 206 means the server ignored the range; start over.
+                # Short reads off the socket are coalesced into chunk-sized writes
+                with open(part_path, "ab" if response.status == 206 else "wb",
+                          buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                    shutil.copyfileobj(response, f, DOWNLOAD_CHUNK_SIZE)
+                    offset = f.tell()
+        os.replace(part_path, dest_path)
+
+        file_size = offset
         return {
             "status": "success",
             "destination": dest_path,
@@ -2399,498 +3751,668 @@ def _download_with_urllib(url: str, dest_path: str) -> dict:
             "message": f"Downloaded to {dest_path}"
         }
 
-    except urllib.error.HTTPError as e:
-        return {"error": f"HTTP error: {e.code} {e.reason}"}
     except Exception as e:
-        return {"error": f"Download failed: {str(e)}"}
+        return {
+            "error": f"Download failed: {str(e)}",
+            "resumable": _try_stat(part_path) is not None
+        }
 
 
 # MCP Protocol Implementation
 def send_response(response: dict):
-    """Send a JSON-RPC response."""
-    sys.stdout.write(json.dumps(response) + "\n")
-    sys.stdout.flush()
+    """Encode and send a JSON-RPC response dict."""
+    send_response_bytes(_json_compact(response).encode("utf-8"))
 
 
-def handle_request(request: dict) -> dict:
-    """Handle an MCP request."""
-    method = request.get("method", "")
-    params = request.get("params", {})
-    request_id = request.get("id")
+# Held while writing a response, so responses from concurrent requests don't interleave
+_stdout_lock = threading.Lock()
 
-    if method == "initialize":
-        return {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "result": {
-                "protocolVersion": "2024-11-05",
-                "serverInfo": {
-                    "name": "comfyui-mcp",
-                    "version": "1.0.0"
+
+def send_response_parts(parts):
+    """Send a pre-encoded JSON-RPC response given as consecutive bytes pieces."""
+    out = sys.stdout.buffer
+    with _stdout_lock:
+        for part in parts:
+            out.write(part)
+        out.write(b"\n")
+        out.flush()
+
+
+def send_response_bytes(response: bytes):
+    """Send a JSON-RPC response that is already encoded as JSON bytes."""
+    # Write bytes straight to the binary layer, skipping the text wrapper's encode
+    out = sys.stdout.buffer
+    with _stdout_lock:
+        out.write(response)
+        out.write(b"\n")
+        out.flush()
+
+
+# Every response starts with this, followed by the encoded request id
+_RESPONSE_PREFIX = b'{"jsonrpc":"2.0","id":'
+
+
+def _response_head(request_id) -> bytes:
+    """Encode the start of a JSON-RPC response, up to and including the id."""
+    return _RESPONSE_PREFIX + json.dumps(request_id).encode("utf-8")
+
+
+def _result_response(request_id, result_json: bytes) -> bytes:
+    """Encode a JSON-RPC result response around an already-encoded result."""
+    return _response_head(request_id) + b',"result":' + result_json + b"}"
+
+
+# JSON-RPC error response after the id; filled with the code and the encoded message
+_ERROR_RESPONSE_TEMPLATE = b',"error":{"code":%d,"message":%b}}'
+
+
+def _error_response(request_id, code: int, message: str) -> bytes:
+    """Encode a JSON-RPC error response."""
+    return _response_head(request_id) + _ERROR_RESPONSE_TEMPLATE % (
+        code, _json_compact(message).encode("utf-8")
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _method_not_found_error(method: str) -> bytes:
+    """Encoded error member for an unknown method; clients tend to repeat the same probes."""
+    return b'"error":{"code":-32601,"message":' + _json_compact(f"Method not found: {method}").encode("utf-8") + b"}"
+
+
+def _text_response(request_id, text: str) -> bytes:
+    """Encode a tools/call response with a single text content item."""
+    return _result_response(
+        request_id,
+        b'{"content":[{"type":"text","text":' + _json_compact(text).encode("utf-8") + b"}]}"
+    )
+
+
+def _image_response(request_id, caption: str, base64_data: bytes, media_type: str) -> tuple:
+    """Encode a tools/call response carrying a caption and an image.
+
+    Base64 is plain ASCII with nothing to escape, so the (often multi-MB)
+    image data is used as-is instead of going through the JSON encoder.
+
+    Returns:
+        The response as a tuple of bytes pieces, written one after another by
+        send_response_parts. The image bytes from _read_base64 are written
+        directly, without being copied into a combined response buffer.
+    """
+    head = (_response_head(request_id)
+            + b',"result":{"content":[{"type":"text","text":' + _json_compact(caption).encode("utf-8")
+            + b'},{"type":"image","data":"')
+    tail = b'","mimeType":' + _json_compact(media_type).encode("utf-8") + b"}]}}"
+    return head, base64_data, tail
+
+
+# Input schemas shared by several tool definitions
+_NO_ARGS_SCHEMA = {"type": "object", "properties": {}, "required": []}
+_STRING_OR_STRING_LIST = [{"type": "string"}, {"type": "array", "items": {"type": "string"}}]
+
+
+def _node_id_schema(description: str) -> dict:
+    """Input schema for a tool whose only argument is a required node_id."""
+    return {
+        "type": "object",
+        "properties": {
+            "node_id": {"type": "string", "description": description}
+        },
+        "required": ["node_id"]
+    }
+
+
+# MCP tool definitions returned by tools/list; built once and shared, so treat as read-only
+TOOLS = [
+    {
+        "name": "get_workflow",
+        "description": "Get the current workflow from ComfyUI. Returns full node graph with all nodes, connections, and widget values. Use summarize_workflow for a lighter overview.",
+        "inputSchema": _NO_ARGS_SCHEMA
+    },
+    {
+        "name": "summarize_workflow",
+        "description": "Get a concise summary of the current workflow: node IDs, types, titles, positions, and connections. Lighter than get_workflow.",
+        "inputSchema": _NO_ARGS_SCHEMA
+    },
+    {
+        "name": "get_node_types",
+        "description": "Search available node types. Returns minimal info by default. Use 'fields' for more details.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "search": {
+                    "oneOf": _STRING_OR_STRING_LIST,
+                    "description": "Search term(s). Array for multiple: [\"camera\", \"sampler\"]"
+                },
+                "category": {
+                    "type": "string",
+                    "description": "Filter by category (e.g., 'loaders', 'sampling')"
                 },
-                "capabilities": {
-                    "tools": {}
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["inputs", "outputs", "description", "input_types", "output_types"]},
+                    "description": "Extra fields to include"
                 }
-            }
+            },
+            "required": []
         }
-
-    elif method == "notifications/initialized":
-        # No response needed for notifications
-        return None
-
-    elif method == "tools/list":
-        return {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "result": {
-                "tools": [
-                    {
-                        "name": "get_workflow",
-                        "description": "Get the current workflow from ComfyUI. Returns full node graph with all nodes, connections, and widget values. Use summarize_workflow for a lighter overview.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {},
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "summarize_workflow",
-                        "description": "Get a concise summary of the current workflow: node IDs, types, titles, positions, and connections. Lighter than get_workflow.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {},
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "get_node_types",
-                        "description": "Search available node types. Returns minimal info by default. Use 'fields' for more details.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "search": {
-                                    "oneOf": [
-                                        {"type": "string"},
-                                        {"type": "array", "items": {"type": "string"}}
-                                    ],
-                                    "description": "Search term(s). Array for multiple: [\"camera\", \"sampler\"]"
-                                },
-                                "category": {
-                                    "type": "string",
-                                    "description": "Filter by category (e.g., 'loaders', 'sampling')"
-                                },
-                                "fields": {
-                                    "type": "array",
-                                    "items": {"type": "string", "enum": ["inputs", "outputs", "description", "input_types", "output_types"]},
-                                    "description": "Extra fields to include"
-                                }
-                            },
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "get_node_info",
-                        "description": "Get detailed info about a specific node in the workflow: type, properties, inputs, outputs, widget values.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "node_id": {"type": "string", "description": "Node ID"}
-                            },
-                            "required": ["node_id"]
-                        }
-                    },
-                    {
-                        "name": "get_status",
-                        "description": "Get ComfyUI status: queue, system stats, and/or history. Returns lightweight summaries by default (counts, IDs). Use detail='full' for more info. History is always paginated.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "include": {
-                                    "type": "array",
-                                    "items": {"type": "string", "enum": ["queue", "system", "history"]},
-                                    "description": "What to include. Default: [\"queue\", \"system\"]"
-                                },
-                                "detail": {
-                                    "type": "string",
-                                    "enum": ["summary", "full"],
-                                    "description": "\"summary\" (default): counts and IDs only. \"full\": includes output summaries and execution times."
-                                },
-                                "history_limit": {
-                                    "type": "integer",
-                                    "description": "Max history entries to return (default 5, max 20). Use with history_offset for pagination."
-                                },
-                                "history_offset": {
-                                    "type": "integer",
-                                    "description": "Skip this many entries from most recent (default 0). Use for pagination."
-                                }
-                            },
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "run",
-                        "description": "Run workflow or interrupt current generation.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "action": {
-                                    "type": "string",
-                                    "enum": ["queue", "interrupt"],
-                                    "description": "\"queue\" to run, \"interrupt\" to stop. Default: queue"
-                                },
-                                "node_ids": {
-                                    "oneOf": [
-                                        {"type": "string"},
-                                        {"type": "array", "items": {"type": "string"}}
-                                    ],
-                                    "description": "Optional: validate these nodes exist before running"
-                                }
-                            },
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "edit_graph",
-                        "description": "Edit workflow graph with batched operations. Actions: create, delete, move, resize, set, connect, disconnect. Operations execute in order; 'create' returns node_id for chaining.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "operations": {
-                                    "oneOf": [
-                                        {"type": "object"},
-                                        {"type": "array", "items": {"type": "object"}}
-                                    ],
-                                    "description": "Operation(s). Each has 'action' + params. Actions: create {node_type, pos_x, pos_y, title, ref, place_in_view}, delete {node_id or node_ids}, move {node_id, x, y} or {node_id, relative_to, direction, gap}, resize {node_id, width, height}, set {node_id, property, value} or {node_id, properties: {k:v}}, connect/disconnect {from_node, from_slot, to_node, to_slot}. Use 'ref' in create to reference node in later ops. Use 'place_in_view: true' to position new nodes at the center of the user's current viewport (nodes are offset horizontally to avoid overlap)."
-                                }
-                            },
-                            "required": ["operations"]
-                        }
-                    },
-                    {
-                        "name": "view_image",
-                        "description": "View an image from a Preview Image or Save Image node. Returns the image as base64 so you can see it. Run the workflow first to generate images.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "node_id": {
-                                    "type": "string",
-                                    "description": "ID of the Preview Image or Save Image node. If not provided, uses the first image node found."
-                                },
-                                "image_index": {
-                                    "type": "integer",
-                                    "description": "Which image to view if node has multiple (0-based). Default: 0"
-                                }
-                            },
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "center_on_node",
-                        "description": "Center the user's viewport on a specific node. Useful after creating nodes to show the user where they were placed.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "node_id": {
-                                    "type": "string",
-                                    "description": "ID of the node to center the view on."
-                                }
-                            },
-                            "required": ["node_id"]
-                        }
-                    },
-                    {
-                        "name": "search_custom_nodes",
-                        "description": "Search for custom nodes in the ComfyUI Manager registry. Returns name, author, description, install status, and star count.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string",
-                                    "description": "Search term (matches name, description, author). Case-insensitive."
-                                },
-                                "status": {
-                                    "type": "string",
-                                    "enum": ["all", "installed", "not-installed"],
-                                    "description": "Filter by installation status. Default: all"
-                                },
-                                "category": {
-                                    "type": "string",
-                                    "description": "Filter by category (e.g., 'animation', '3d', 'video')"
-                                },
-                                "limit": {
-                                    "type": "integer",
-                                    "description": "Maximum results to return. Default: 10"
-                                }
-                            },
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "install_custom_node",
-                        "description": "Install a custom node via ComfyUI Manager. Requires restart to complete.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "node_id": {
-                                    "type": "string",
-                                    "description": "Node ID, name, or git URL to install"
-                                }
-                            },
-                            "required": ["node_id"]
-                        }
-                    },
-                    {
-                        "name": "uninstall_custom_node",
-                        "description": "Uninstall a custom node via ComfyUI Manager. Requires restart to complete.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "node_id": {
-                                    "type": "string",
-                                    "description": "Node ID or name to uninstall"
-                                }
-                            },
-                            "required": ["node_id"]
-                        }
-                    },
-                    {
-                        "name": "update_custom_node",
-                        "description": "Update a custom node to the latest version via ComfyUI Manager. Requires restart to complete.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "node_id": {
-                                    "type": "string",
-                                    "description": "Node ID or name to update"
-                                }
-                            },
-                            "required": ["node_id"]
-                        }
+    },
+    {
+        "name": "get_node_info",
+        "description": "Get detailed info about a specific node in the workflow: type, properties, inputs, outputs, widget values.",
+        "inputSchema": _node_id_schema("Node ID")
+    },
+    {
+        "name": "get_status",
+        "description": "Get ComfyUI status: queue, system stats, and/or history. Returns lightweight summaries by default (counts, IDs). Use detail='full' for more info. History is always paginated.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "include": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["queue", "system", "history"]},
+                    "description": "What to include. Default: [\"queue\", \"system\"]"
+                },
+                "detail": {
+                    "type": "string",
+                    "enum": ["summary", "full"],
+                    "description": "\"summary\" (default): counts and IDs only. \"full\": includes output summaries and execution times."
+                },
+                "history_limit": {
+                    "type": "integer",
+                    "description": "Max history entries to return (default 5, max 20). Use with history_offset for pagination."
+                },
+                "history_offset": {
+                    "type": "integer",
+                    "description": "Skip this many entries from most recent (default 0). Use for pagination."
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "run",
+        "description": "Run workflow or interrupt current generation.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": ["queue", "interrupt"],
+                    "description": "\"queue\" to run, \"interrupt\" to stop. Default: queue"
+                },
+                "node_ids": {
+                    "oneOf": _STRING_OR_STRING_LIST,
+                    "description": "Optional: validate these nodes exist before running"
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "edit_graph",
+        "description": "Edit workflow graph with batched operations. Actions: create, delete, move, resize, set, connect, disconnect. Operations execute in order; 'create' returns node_id for chaining.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "operations": {
+                    "oneOf": [
+                        {"type": "object"},
+                        {"type": "array", "items": {"type": "object"}}
+                    ],
+                    "description": "Operation(s). Each has 'action' + params. Actions: create {node_type, pos_x, pos_y, title, ref, place_in_view}, delete {node_id or node_ids}, move {node_id, x, y} or {node_id, relative_to, direction, gap}, resize {node_id, width, height}, set {node_id, property, value} or {node_id, properties: {k:v}}, connect/disconnect {from_node, from_slot, to_node, to_slot}. Use 'ref' in create to reference node in later ops. Use 'place_in_view: true' to position new nodes at the center of the user's current viewport (nodes are offset horizontally to avoid overlap)."
+                }
+            },
+            "required": ["operations"]
+        }
+    },
+    {
+        "name": "view_image",
+        "description": "View an image from a Preview Image or Save Image node. Returns the image as base64 so you can see it. Run the workflow first to generate images.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "node_id": {
+                    "type": "string",
+                    "description": "ID of the Preview Image or Save Image node. If not provided, uses the first image node found."
+                },
+                "image_index": {
+                    "type": "integer",
+                    "description": "Which image to view if node has multiple (0-based). Default: 0"
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "center_on_node",
+        "description": "Center the user's viewport on a specific node. Useful after creating nodes to show the user where they were placed.",
+        "inputSchema": _node_id_schema("ID of the node to center the view on.")
+    },
+    {
+        "name": "search_custom_nodes",
+        "description": "Search for custom nodes in the ComfyUI Manager registry. Returns name, author, description, install status, and star count.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search term (matches name, description, author). Case-insensitive."
+                },
+                "status": {
+                    "type": "string",
+                    "enum": ["all", "installed", "not-installed"],
+                    "description": "Filter by installation status. Default: all"
+                },
+                "category": {
+                    "type": "string",
+                    "description": "Filter by category (e.g., 'animation', '3d', 'video')"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum results to return. Default: 10"
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "install_custom_node",
+        "description": "Install a custom node via ComfyUI Manager. Requires restart to complete. If the node has a requirements.txt and ComfyUI's Python environment can be found, its dependencies are installed in the background; check progress with check_install_status before restarting.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "node_id": {
+                    "type": "string",
+                    "description": "Node ID, name, or git URL to install"
+                },
+                "install_requirements": {
+                    "type": "boolean",
+                    "description": "Install requirements.txt with pip in the background. Default: true"
+                }
+            },
+            "required": ["node_id"]
+        }
+    },
+    {
+        "name": "check_install_status",
+        "description": "Check whether the background dependency install started by install_custom_node has finished. Returns running, done, or failed with the end of pip's output.",
+        "inputSchema": _node_id_schema("Node ID, name, or git URL that was installed")
+    },
+    {
+        "name": "uninstall_custom_node",
+        "description": "Uninstall a custom node via ComfyUI Manager. Requires restart to complete.",
+        "inputSchema": _node_id_schema("Node ID or name to uninstall")
+    },
+    {
+        "name": "update_custom_node",
+        "description": "Update a custom node to the latest version via ComfyUI Manager. Requires restart to complete.",
+        "inputSchema": _node_id_schema("Node ID or name to update")
+    },
+    {
+        "name": "download_model",
+        "description": "Download a model to the ComfyUI models folder. Supports Hugging Face, CivitAI, and direct URLs. For gated HF models, will return instructions to provide a token.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "url": {
+                    "type": "string",
+                    "description": "Model URL: HF (https://huggingface.co/user/repo/...), CivitAI (https://civitai.com/...), direct URL, or HF shorthand (user/repo/file.safetensors)"
+                },
+                "model_type": {
+                    "type": "string",
+                    "enum": ["checkpoint", "lora", "vae", "controlnet", "clip", "clip_vision", "unet", "diffusion_models", "text_encoders", "upscale_models", "embeddings", "hypernetworks", "ipadapter", "instantid", "insightface", "pulid", "animatediff"],
+                    "description": "Model type - determines destination folder in ComfyUI/models/"
+                },
+                "filename": {
+                    "type": "string",
+                    "description": "Optional: Override the filename. Auto-detected from URL if not provided."
+                },
+                "hf_token": {
+                    "type": "string",
+                    "description": "Hugging Face token for gated models. Only provide if download fails with auth error."
+                },
+                "subfolder": {
+                    "type": "string",
+                    "description": "Optional: Subfolder within the model type directory"
+                },
+                "parallel": {
+                    "type": "boolean",
+                    "description": "Use parallel connections for large files where supported (hf_transfer for Hugging Face). Default: true"
+                }
+            },
+            "required": ["url", "model_type"]
+        }
+    },
+    {
+        "name": "download_models",
+        "description": "Download several models at once (e.g. all the LoRAs a workflow needs). Downloads run concurrently with a per-host limit; each entry takes the same arguments as download_model.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "downloads": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "url": {"type": "string"},
+                            "model_type": {"type": "string"},
+                            "filename": {"type": "string"},
+                            "hf_token": {"type": "string"},
+                            "subfolder": {"type": "string"}
+                        },
+                        "required": ["url", "model_type"]
                     },
-                    {
-                        "name": "download_model",
-                        "description": "Download a model to the ComfyUI models folder. Supports Hugging Face, CivitAI, and direct URLs. For gated HF models, will return instructions to provide a token.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "url": {
-                                    "type": "string",
-                                    "description": "Model URL: HF (https://huggingface.co/user/repo/...), CivitAI (https://civitai.com/...), direct URL, or HF shorthand (user/repo/file.safetensors)"
-                                },
-                                "model_type": {
-                                    "type": "string",
-                                    "enum": ["checkpoint", "lora", "vae", "controlnet", "clip", "clip_vision", "unet", "diffusion_models", "text_encoders", "upscale_models", "embeddings", "hypernetworks", "ipadapter", "instantid", "insightface", "pulid", "animatediff"],
-                                    "description": "Model type - determines destination folder in ComfyUI/models/"
-                                },
-                                "filename": {
-                                    "type": "string",
-                                    "description": "Optional: Override the filename. Auto-detected from URL if not provided."
-                                },
-                                "hf_token": {
-                                    "type": "string",
-                                    "description": "Hugging Face token for gated models. Only provide if download fails with auth error."
-                                },
-                                "subfolder": {
-                                    "type": "string",
-                                    "description": "Optional: Subfolder within the model type directory"
-                                }
-                            },
-                            "required": ["url", "model_type"]
-                        }
-                    }
-                ]
-            }
+                    "description": "Downloads as {url, model_type, filename?, hf_token?, subfolder?} objects"
+                },
+                "parallel": {
+                    "type": "boolean",
+                    "description": "Use parallel connections for large files where supported. Default: true"
+                }
+            },
+            "required": ["downloads"]
         }
+    }
+]
+
+# tools/list result, encoded once; only the request id differs per response
+TOOLS_LIST_JSON = _json_compact({"tools": TOOLS}).encode("utf-8")
+
+# initialize result; static, so built and encoded once
+INITIALIZE_RESULT = {
+    "protocolVersion": "2024-11-05",
+    "serverInfo": {
+        "name": "comfyui-mcp",
+        "version": "1.0.0"
+    },
+    "capabilities": {
+        "tools": {}
+    }
+}
+INITIALIZE_RESULT_JSON = _json_compact(INITIALIZE_RESULT).encode("utf-8")
+
+
+def _get_node_info_call(args: dict):
+    """get_node_info with node_id normalized; a bad ID is reported like its other errors."""
+    try:
+        node_id = parse_node_id(args.get("node_id", ""))
+    except ValueError as e:
+        return f"error: {e}"
+    return get_node_info(node_id)
 
-    elif method == "tools/call":
-        tool_name = params.get("name", "")
-        tool_args = params.get("arguments", {})
 
+def _view_image_call(args: dict):
+    """view_image with node_id optional and normalized like the other tools."""
+    node_id = args.get("node_id")
+    if node_id in (None, ""):
+        node_id = None
+    else:
         try:
-            result = None
-
-            # New consolidated tools
-            if tool_name == "get_workflow":
-                result = get_workflow()
-            elif tool_name == "summarize_workflow":
-                result = summarize_workflow()
-            elif tool_name == "get_node_types":
-                result = get_node_types(
-                    search=tool_args.get("search"),
-                    category=tool_args.get("category"),
-                    fields=tool_args.get("fields")
-                )
-            elif tool_name == "get_node_info":
-                result = get_node_info(tool_args.get("node_id", ""))
-            elif tool_name == "get_status":
-                result = get_status(
-                    include=tool_args.get("include"),
-                    detail=tool_args.get("detail", "summary"),
-                    history_limit=tool_args.get("history_limit", 5),
-                    history_offset=tool_args.get("history_offset", 0)
-                )
-            elif tool_name == "run":
-                result = run(
-                    action=tool_args.get("action", "queue"),
-                    node_ids=tool_args.get("node_ids")
-                )
-            elif tool_name == "edit_graph":
-                result = edit_graph(tool_args.get("operations", []))
-            elif tool_name == "view_image":
-                result = view_image(
-                    node_id=tool_args.get("node_id"),
-                    image_index=tool_args.get("image_index", 0)
-                )
-            elif tool_name == "center_on_node":
-                result = center_on_node(tool_args.get("node_id", ""))
-
-            # Legacy tools (keep for backwards compatibility)
-            elif tool_name == "get_queue":
-                result = get_queue()
-            elif tool_name == "get_system_stats":
-                result = get_system_stats()
-            elif tool_name == "get_history":
-                result = get_history(tool_args.get("prompt_id"))
-            elif tool_name == "interrupt":
-                result = interrupt_generation()
-            elif tool_name == "run_node":
-                result = run_node(tool_args.get("node_ids", ""))
-            elif tool_name == "create_node":
-                result = create_node(tool_args.get("nodes", {}))
-            elif tool_name == "delete_nodes":
-                result = delete_nodes(tool_args.get("node_ids", ""))
-            elif tool_name == "set_node_property":
-                result = set_node_property(tool_args.get("properties", {}))
-            elif tool_name == "connect_nodes":
-                result = connect_nodes(tool_args.get("connections", {}))
-            elif tool_name == "disconnect_nodes":
-                result = disconnect_nodes(tool_args.get("disconnections", {}))
-            elif tool_name == "move_nodes":
-                result = move_nodes(tool_args.get("moves", {}))
-
-            # Node management tools
-            elif tool_name == "search_custom_nodes":
-                result = search_custom_nodes(
-                    query=tool_args.get("query"),
-                    status=tool_args.get("status", "all"),
-                    category=tool_args.get("category"),
-                    limit=tool_args.get("limit", 10)
-                )
-            elif tool_name == "install_custom_node":
-                result = install_custom_node(tool_args.get("node_id", ""))
-            elif tool_name == "uninstall_custom_node":
-                result = uninstall_custom_node(tool_args.get("node_id", ""))
-            elif tool_name == "update_custom_node":
-                result = update_custom_node(tool_args.get("node_id", ""))
-
-            # Model download
-            elif tool_name == "download_model":
-                result = download_model(
-                    url=tool_args.get("url", ""),
-                    model_type=tool_args.get("model_type", ""),
-                    filename=tool_args.get("filename"),
-                    hf_token=tool_args.get("hf_token"),
-                    subfolder=tool_args.get("subfolder")
-                )
+            node_id = parse_node_id(node_id)
+        except ValueError as e:
+            return {"error": str(e)}
+    return view_image(node_id=node_id, image_index=args.get("image_index", 0))
+
+
+# tools/call handlers: tool name -> function of the call's arguments dict
+TOOL_HANDLERS = {
+    # New consolidated tools
+    "get_workflow": lambda args: get_workflow(),
+    "summarize_workflow": lambda args: summarize_workflow(),
+    "get_node_types": lambda args: get_node_types(
+        search=args.get("search"),
+        category=args.get("category"),
+        fields=args.get("fields")
+    ),
+    "get_node_info": _get_node_info_call,
+    "get_status": lambda args: get_status(
+        include=args.get("include"),
+        detail=args.get("detail", "summary"),
+        history_limit=args.get("history_limit", 5),
+        history_offset=args.get("history_offset", 0)
+    ),
+    "run": lambda args: run(
+        action=args.get("action", "queue"),
+        node_ids=args.get("node_ids")
+    ),
+    "edit_graph": lambda args: edit_graph(args.get("operations", [])),
+    "view_image": _view_image_call,
+    "center_on_node": lambda args: center_on_node(args.get("node_id", "")),
+
+    # Legacy tools (keep for backwards compatibility)
+    "get_queue": lambda args: get_queue(),
+    "get_system_stats": lambda args: get_system_stats(),
+    "get_history": lambda args: get_history(args.get("prompt_id")),
+    "interrupt": lambda args: interrupt_generation(),
+    "run_node": lambda args: run_node(args.get("node_ids", "")),
+    "create_node": lambda args: create_node(args.get("nodes", {})),
+    "delete_nodes": lambda args: delete_nodes(args.get("node_ids", "")),
+    "set_node_property": lambda args: set_node_property(args.get("properties", {})),
+    "connect_nodes": lambda args: connect_nodes(args.get("connections", {})),
+    "disconnect_nodes": lambda args: disconnect_nodes(args.get("disconnections", {})),
+    "move_nodes": lambda args: move_nodes(args.get("moves", {})),
+
+    # Node management tools
+    "search_custom_nodes": lambda args: search_custom_nodes(
+        query=args.get("query"),
+        status=args.get("status", "all"),
+        category=args.get("category"),
+        limit=args.get("limit", 10)
+    ),
+    "install_custom_node": lambda args: install_custom_node(
+        args.get("node_id", ""),
+        install_requirements=args.get("install_requirements", True)
+    ),
+    "check_install_status": lambda args: check_install_status(args.get("node_id", "")),
+    "uninstall_custom_node": lambda args: uninstall_custom_node(args.get("node_id", "")),
+    "update_custom_node": lambda args: update_custom_node(args.get("node_id", "")),
+
+    # Model download
+    "download_model": lambda args: download_model(
+        url=args.get("url", ""),
+        model_type=args.get("model_type", ""),
+        filename=args.get("filename"),
+        hf_token=args.get("hf_token"),
+        subfolder=args.get("subfolder"),
+        parallel=args.get("parallel", True)
+    ),
+    "download_models": lambda args: download_models(
+        args.get("downloads", []),
+        parallel=args.get("parallel", True)
+    ),
+}
 
-            else:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32601,
-                        "message": f"Unknown tool: {tool_name}"
-                    }
-                }
-        except Exception as e:
-            # Return error as tool result instead of crashing
-            result = {"error": f"Tool execution failed: {type(e).__name__}: {e}"}
 
-        # Handle image results specially - return as image content type
-        if tool_name == "view_image" and "base64_data" in result:
-            # Extract image data and return as image content
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"Image from node {result.get('node_id')} ({result.get('node_title')}): {result.get('filename')}"
-                        },
-                        {
-                            "type": "image",
-                            "data": result["base64_data"],
-                            "mimeType": result.get("media_type", "image/png")
-                        }
-                    ]
-                }
-            }
+def _initialize(request_id, params: dict) -> bytes:
+    """initialize: report protocol version, server info, and capabilities."""
+    return _result_response(request_id, INITIALIZE_RESULT_JSON)
 
-        # If result is already a string (e.g., TOON-like format), use it directly
-        # Otherwise JSON-serialize it
-        if isinstance(result, str):
-            text_content = result
-        else:
-            text_content = json.dumps(result, indent=2)
 
-        return {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "result": {
-                "content": [
-                    {
-                        "type": "text",
-                        "text": text_content
-                    }
-                ]
-            }
-        }
+def _tools_list(request_id, params: dict) -> bytes:
+    """tools/list: the pre-encoded tool definitions."""
+    return _result_response(request_id, TOOLS_LIST_JSON)
 
+
+def _tools_call(request_id, params: dict):
+    """tools/call: run a tool and wrap its result as MCP content."""
+    tool_name = params.get("name", "")
+    tool_args = params.get("arguments", {})
+
+    handler = TOOL_HANDLERS.get(tool_name)
+    if handler is None:
+        return _error_response(request_id, -32601, f"Unknown tool: {tool_name}")
+
+    try:
+        result = handler(tool_args)
+    except Exception as e:
+        # Return error as tool result instead of crashing
+        result = {"error": f"Tool execution failed: {type(e).__name__}: {e}"}
+
+    # Handle image results specially - return as image content type
+    # Compared by handler identity, a pointer check, rather than by tool name
+    if handler is _view_image_call:
+        base64_data = result.get("base64_data")
+        if base64_data is not None:
+            return _image_response(
+                request_id,
+                f"Image from node {result.get('node_id')} ({result.get('node_title')}): {result.get('filename')}",
+                base64_data,
+                result.get("media_type", "image/png")
+            )
+
+    # If result is already a string (e.g., TOON-like format), use it directly
+    # Otherwise JSON-serialize it (compactly unless MCP_PRETTY is set)
+    if isinstance(result, str):
+        text_content = result
     else:
-        return {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "error": {
-                "code": -32601,
-                "message": f"Method not found: {method}"
-            }
-        }
+        text_content = _encode_tool_result(result)
+
+    return _text_response(request_id, text_content)
+
+
+def _tool_result_encoder():
+    """Pick the encoder for tool results: compact, or indented if MCP_PRETTY is set."""
+    import os
+
+    # Indentation only helps someone reading the raw stream while debugging
+    if os.environ.get("MCP_PRETTY"):
+        return json.JSONEncoder(indent=2).encode
+    return _json_compact
+
+
+_encode_tool_result = _tool_result_encoder()
+
+
+# JSON-RPC method handlers: method name -> function of (request_id, params)
+METHOD_HANDLERS = {
+    "initialize": _initialize,
+    # No response needed for notifications
+    "notifications/initialized": lambda request_id, params: None,
+    "tools/list": _tools_list,
+    "tools/call": _tools_call,
+}
+
+
+def handle_request(request: dict):
+    """Handle an MCP request.
+
+    Returns:
+        Response dict, pre-encoded response bytes (or a tuple of bytes pieces),
+        or None for notifications
+    """
+    method = request.get("method", "")
+    request_id = request.get("id")
+
+    if not isinstance(method, str):
+        return _error_response(request_id, -32601, f"Method not found: {method}")
+
+    handler = METHOD_HANDLERS.get(method)
+    if handler is None:
+        return _response_head(request_id) + b"," + _method_not_found_error(method) + b"}"
+    return handler(request_id, request.get("params", {}))
+
+
+# Bytes requested per stdin read; a burst of requests arrives in one read
+STDIN_READ_SIZE = 1 << 16
+
+
+def _stdin_lines():
+    """Yield raw request lines from stdin, reading it in large blocks."""
+    import os
+
+    fd = sys.stdin.buffer.fileno()
+    partial = []  # Pieces of a line split across reads, joined once it ends
+    while True:
+        chunk = os.read(fd, STDIN_READ_SIZE)
+        if not chunk:
+            break
+        *complete, rest = chunk.split(b"\n")
+        if complete:
+            if partial:
+                partial.append(complete[0])
+                complete[0] = b"".join(partial)
+                partial = []
+            yield from complete
+        if rest:
+            partial.append(rest)
+    if partial:
+        yield b"".join(partial)
+
+
+# Tools that don't read or change the graph run on REQUEST_WORKERS threads, so
+# a long download or registry search doesn't hold up other calls. All other
+# tools run one at a time in arrival order, so graph edits and reads keep
+# their order. get_node_types stays serial: it rebuilds the shared
+# object_info index, which isn't safe to read while another thread rebuilds it.
+CONCURRENT_TOOLS = frozenset({
+    "get_status", "get_queue", "get_system_stats", "get_history",
+    "search_custom_nodes", "check_install_status", "download_model", "download_models",
+})
+REQUEST_WORKERS = 4
+
+
+def _respond(request):
+    """Handle one parsed request and write its response, if any."""
+    request_id = None
+    try:
+        request_id = request.get("id")
+        response = handle_request(request)
+        if isinstance(response, bytes):
+            send_response_bytes(response)
+        elif isinstance(response, tuple):
+            send_response_parts(response)
+        elif response:  # Don't send response for notifications
+            send_response(response)
+    except Exception as e:
+        # Catch any unhandled exceptions to prevent MCP connection from closing
+        send_response_bytes(_error_response(request_id, -32000, f"Internal error: {type(e).__name__}: {e}"))
+
+
+def _tool_call_name(request):
+    """Name of the tool a tools/call request calls, or None for other requests."""
+    if not isinstance(request, dict) or request.get("method") != "tools/call":
+        return None
+    params = request.get("params")
+    return params.get("name") if isinstance(params, dict) else None
 
 
 def main():
-    """Main loop - read JSON-RPC requests from stdin, write responses to stdout."""
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
+    """Main loop - read JSON-RPC requests from stdin, write responses to stdout.
 
-        request_id = None
-        try:
-            request = json.loads(line)
-            request_id = request.get("id")
-            response = handle_request(request)
-            if response:  # Don't send response for notifications
-                send_response(response)
-        except json.JSONDecodeError as e:
-            send_response({
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32700,
-                    "message": f"Parse error: {e}"
-                }
-            })
-        except Exception as e:
-            # Catch any unhandled exceptions to prevent MCP connection from closing
-            send_response({
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32000,
-                    "message": f"Internal error: {type(e).__name__}: {e}"
-                }
-            })
+    Tool calls run off the reading thread (see CONCURRENT_TOOLS), so their
+    responses can arrive out of order; clients match them up by id.
+    """
+    concurrent_calls = concurrent.futures.ThreadPoolExecutor(
+        max_workers=REQUEST_WORKERS, thread_name_prefix="comfy-pilot-request"
+    )
+    serial_calls = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="comfy-pilot-serial"
+    )
+    try:
+        # Read raw bytes; json.loads decodes UTF-8 itself, so skip the text layer
+        for line in _stdin_lines():
+            # json.loads ignores surrounding whitespace, so lines aren't stripped;
+            # isspace() stops at the first non-whitespace byte
+            if not line or line.isspace():
+                continue
+
+            try:
+                request = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                send_response_bytes(_error_response(None, -32700, f"Parse error: {e}"))
+                continue
+
+            tool_name = _tool_call_name(request)
+            if tool_name is None:
+                # initialize, tools/list, notifications: cheap, answer inline
+                _respond(request)
+            elif isinstance(tool_name, str) and tool_name in CONCURRENT_TOOLS:
+                concurrent_calls.submit(_respond, request)
+            else:
+                serial_calls.submit(_respond, request)
+    finally:
+        # Let in-flight calls finish and send their responses before exiting
+        serial_calls.shutdown(wait=True)
+        concurrent_calls.shutdown(wait=True)
 
 
 if __name__ == "__main__":